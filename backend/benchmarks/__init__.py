@@ -0,0 +1 @@
+# Benchmark package: synthetic data generation and load testing
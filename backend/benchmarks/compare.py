@@ -0,0 +1,40 @@
+"""
+Compare two load_test result files route by route
+Run this from the backend directory:
+    python -m benchmarks.compare benchmarks/results/before.json benchmarks/results/after.json
+"""
+import argparse
+import json
+
+METRICS = ["p50_ms", "p95_ms", "p99_ms", "throughput_rps", "queries_per_request"]
+
+def change(before, after) -> str:
+    if before is None or after is None:
+        return "-"
+    if not before:
+        return f"{after}"
+    return f"{after} ({(after - before) / before * 100:+.0f}%)"
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    print(f"before: {before['meta']['commit']} {before['meta']['timestamp']}")
+    print(f"after:  {after['meta']['commit']} {after['meta']['timestamp']}")
+    for route in after["routes"]:
+        if route not in before["routes"]:
+            continue
+        print(route)
+        for metric in METRICS:
+            print(f"  {metric:<20} {before['routes'][route][metric]!s:>10} -> "
+                  f"{change(before['routes'][route][metric], after['routes'][route][metric])}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Compare read/write throughput of the database profiles under concurrent load
+Run this from the backend directory against a generated database:
+    python -m benchmarks.db_profiles --database-url sqlite:///./bench.db --readers 16 --writers 4
+
+Each profile gets its own engine built exactly like the app's. SQLite
+databases are copied per profile first, because WAL mode sticks to the file.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from benchmarks.load_test import git_commit, percentile
+
+def sqlite_path(url: str) -> str:
+    return url.split(":///", 1)[1]
+
+def worker(engine, statements, op: str, ticket_ids: list, deadline: float, seed: int, results: dict):
+    from sqlalchemy.exc import OperationalError
+
+    rng = random.Random(seed)
+    latencies = []
+    errors = 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            with engine.begin() as conn:
+                if op == "read":
+                    conn.execute(statements["page"], {"limit": 50}).all()
+                    conn.execute(statements["detail"], {"id": rng.choice(ticket_ids)}).first()
+                else:
+                    conn.execute(statements["write"], {"id": rng.choice(ticket_ids), "now": datetime.utcnow(),
+                                                       "priority": rng.choice(["LOW", "MEDIUM", "HIGH"])})
+        except OperationalError:
+            # "database is locked" on SQLite once busy_timeout runs out
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+    results.setdefault(op, []).append((latencies, errors))
+
+def run_profile(url: str, profile: str, args) -> dict:
+    from sqlalchemy import text
+
+    from database import create_database_engine
+
+    engine = create_database_engine(url, profile)
+    statements = {
+        "page": text(
+            "SELECT t.*, r.username, a.username FROM tickets t JOIN users r ON r.id = t.requester_id "
+            "LEFT JOIN users a ON a.id = t.assignee_id ORDER BY t.created_at DESC, t.id DESC LIMIT :limit"
+        ),
+        "detail": text("SELECT * FROM tickets WHERE id = :id"),
+        "write": text("UPDATE tickets SET priority = :priority, updated_at = :now WHERE id = :id"),
+    }
+    with engine.connect() as conn:
+        ticket_ids = conn.execute(text("SELECT id FROM tickets ORDER BY id DESC LIMIT 10000")).scalars().all()
+    if not ticket_ids:
+        raise SystemExit("No tickets to benchmark, generate a dataset first")
+
+    results = {}
+    deadline = time.perf_counter() + args.seconds
+    threads = [
+        threading.Thread(target=worker, args=(engine, statements, op, ticket_ids, deadline, seed, results))
+        for seed, op in enumerate(["read"] * args.readers + ["write"] * args.writers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    report = {}
+    for op, runs in results.items():
+        latencies = sorted(latency for run, _ in runs for latency in run)
+        report[op] = {
+            "operations": len(latencies),
+            "errors": sum(errors for _, errors in runs),
+            "ops_per_second": round(len(latencies) / args.seconds, 1),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        }
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark database profiles under concurrent reads and writes")
+    parser.add_argument("--database-url", default="sqlite:///./bench.db")
+    parser.add_argument("--profiles", nargs="*", default=["default", "production"])
+    parser.add_argument("--readers", type=int, default=16, help="Reader threads")
+    parser.add_argument("--writers", type=int, default=4, help="Writer threads")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Duration per profile")
+    parser.add_argument("--out", help="Results file (default: benchmarks/results/db-profiles-<timestamp>-<commit>.json)")
+    args = parser.parse_args()
+
+    profiles = {}
+    for profile in args.profiles:
+        url = args.database_url
+        workdir = None
+        if url.startswith("sqlite"):
+            workdir = tempfile.mkdtemp()
+            copy = os.path.join(workdir, "bench.db")
+            shutil.copyfile(sqlite_path(url), copy)
+            url = f"sqlite:///{copy}"
+        try:
+            profiles[profile] = run_profile(url, profile, args)
+        finally:
+            if workdir:
+                shutil.rmtree(workdir)
+        for op, result in profiles[profile].items():
+            print(f"{profile:<12} {op:<6} {result['ops_per_second']:>9.1f} ops/s  p50 {result['p50_ms']:>8.2f}ms  "
+                  f"p99 {result['p99_ms']:>8.2f}ms  errors {result['errors']}")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "target": args.database_url,
+            "readers": args.readers,
+            "writers": args.writers,
+            "seconds": args.seconds,
+        },
+        "profiles": profiles,
+    }
+    out = args.out or os.path.join(
+        os.path.dirname(__file__), "results",
+        f"db-profiles-{report['meta']['timestamp'].replace(':', '')}-{report['meta']['commit'] or 'nocommit'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Generate a realistic synthetic ticket database for benchmarking
+Run this from the backend directory:
+    python -m benchmarks.generate_data --database-url sqlite:///./bench_1m.db --tickets 1m
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+import bcrypt
+
+STATUS_WEIGHTS = {
+    "open": 25,
+    "in_progress": 10,
+    "pending": 15,
+    "resolved": 30,
+    "closed": 20,
+}
+PRIORITY_WEIGHTS = {
+    "low": 30,
+    "medium": 45,
+    "high": 20,
+    "urgent": 5,
+}
+SUBJECTS = [
+    "BankEx ID: {a}/{b} - Bankruptcy",
+    "BankEx ID: {a}/{b} - Consumer Proposal",
+    "Payment Issue - Account Review Required",
+    "Login Authentication Error - Unable to Access Dashboard",
+    "Data Export Feature Request - CSV Format",
+    "Password Reset Not Working - Email Not Received",
+    "Report Generation Timeout - Large Dataset",
+    "Kapcharge Notification - Interac ADR Transaction Received",
+    "API Integration Error - Third Party Service",
+    "Refund request for invoice {a}",
+]
+WORDS = (
+    "account payment customer balance transfer statement overdue invoice refund proposal creditor "
+    "trustee filing review urgent follow up callback dashboard login error timeout report export"
+).split()
+
+def parse_count(value: str) -> int:
+    """Accept plain integers or k/m suffixes, e.g. 10k, 1m, 10m"""
+    value = value.strip().lower()
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(value[-1], 1)
+    return int(float(value.rstrip("km")) * multiplier)
+
+def zipf_weights(n: int, skew: float) -> list[float]:
+    """Rank-based weights so a few agents own most of the tickets"""
+    return [1 / (rank ** skew) for rank in range(1, n + 1)]
+
+def description(rng: random.Random) -> str:
+    return " ".join(rng.choices(WORDS, k=rng.randint(20, 80))).capitalize() + "."
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic ticket database")
+    parser.add_argument("--database-url", default="sqlite:///./bench.db")
+    parser.add_argument("--tickets", type=parse_count, default=parse_count("10k"))
+    parser.add_argument("--agents", type=int, default=50)
+    parser.add_argument("--customers", type=parse_count, default=None,
+                        help="Requesting users (default: one per 20 tickets, at least 100)")
+    parser.add_argument("--assignee-skew", type=float, default=1.2,
+                        help="Zipf exponent of the assignee distribution")
+    parser.add_argument("--unassigned", type=float, default=0.1, help="Share of tickets with no assignee")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    # database.py reads DATABASE_URL at import time
+    os.environ["DATABASE_URL"] = args.database_url
+    from sqlalchemy import insert
+
+    from counters import rebuild_ticket_counters
+    from database import Base, SessionLocal, engine
+    from models import NumberSequence, Ticket, TicketPriority, TicketStatus, User
+    from search import setup_search_index
+
+    rng = random.Random(args.seed)
+    customers = args.customers or max(100, args.tickets // 20)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        if db.query(Ticket).first() is not None:
+            raise SystemExit("Target database already has tickets, point --database-url at a new database")
+
+        # One hash for everyone: hashing per user would dominate generation time
+        password_hash = bcrypt.hashpw(b"password123", bcrypt.gensalt()).decode("utf-8")
+        admin_hash = bcrypt.hashpw(b"admin123", bcrypt.gensalt()).decode("utf-8")
+        users = [{
+            "email": "admin@example.com", "username": "admin", "full_name": "Admin User",
+            "hashed_password": admin_hash, "is_admin": 1
+        }]
+        users += [{
+            "email": f"agent{i}@example.com", "username": f"agent{i}", "full_name": f"Agent {i}",
+            "hashed_password": password_hash, "is_admin": 0
+        } for i in range(args.agents)]
+        users += [{
+            "email": f"customer{i}@example.com", "username": f"customer{i}", "full_name": f"Customer {i}",
+            "hashed_password": password_hash, "is_admin": 0
+        } for i in range(customers)]
+        for start in range(0, len(users), args.batch_size):
+            db.execute(insert(User), users[start:start + args.batch_size])
+        db.commit()
+        print(f"Created {len(users)} users")
+
+        # Ids follow insertion order on a fresh database
+        agent_ids = list(range(1, args.agents + 2))
+        customer_ids = list(range(args.agents + 2, len(users) + 1))
+        agent_weights = zipf_weights(len(agent_ids), args.assignee_skew)
+        statuses, status_weights = zip(*STATUS_WEIGHTS.items())
+        priorities, priority_weights = zip(*PRIORITY_WEIGHTS.items())
+        now = datetime.utcnow()
+        first_number = 1_000_000
+
+        for start in range(0, args.tickets, args.batch_size):
+            count = min(args.batch_size, args.tickets - start)
+            assignees = rng.choices(agent_ids, weights=agent_weights, k=count)
+            batch = []
+            for offset, status, priority, assignee_id in zip(
+                range(count),
+                rng.choices(statuses, weights=status_weights, k=count),
+                rng.choices(priorities, weights=priority_weights, k=count),
+                assignees
+            ):
+                created_at = now - timedelta(seconds=rng.randint(0, 2 * 365 * 24 * 3600))
+                batch.append({
+                    "ticket_number": f"#{first_number + start + offset}",
+                    "subject": rng.choice(SUBJECTS).format(a=rng.randint(10**6, 10**7), b=rng.randint(10**7, 10**8)),
+                    "description": description(rng),
+                    "status": TicketStatus(status),
+                    "priority": TicketPriority(priority),
+                    "requester_id": rng.choice(customer_ids),
+                    "assignee_id": None if rng.random() < args.unassigned else assignee_id,
+                    "created_at": created_at,
+                    "updated_at": created_at + timedelta(seconds=rng.randint(0, 7 * 24 * 3600)),
+                    "review_date": None,
+                })
+            db.execute(insert(Ticket), batch)
+            db.commit()
+            print(f"  {start + count}/{args.tickets} tickets", end="\r", flush=True)
+        print()
+
+        db.add(NumberSequence(name="ticket_number", next_value=first_number + args.tickets))
+        db.commit()
+        print("Building counters and search index...")
+        rebuild_ticket_counters(db)
+    finally:
+        db.close()
+
+    setup_search_index(engine)
+    print(f"Generated {args.tickets} tickets in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Drive every API route with concurrent requests and record latency percentiles
+Run this from the backend directory against a generated database:
+    python -m benchmarks.load_test --database-url sqlite:///./bench_1m.db --concurrency 50
+
+By default the app runs in-process (through httpx's ASGI transport), which
+also lets the run count SQL statements per request. Pass --url to load test
+a running server instead; SQL counts are then not available.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable
+
+import httpx
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    # Builds (path, request kwargs) from the shared run context
+    build: Callable
+    # Scenarios that hash passwords are far slower, so they get fewer requests
+    max_requests: int | None = None
+    auth: bool = True
+
+@dataclass
+class Context:
+    ticket_ids: list = field(default_factory=list)
+    user_ids: list = field(default_factory=list)
+    created_ids: list = field(default_factory=list)
+    # next_token of the changes feed's first page
+    changes_token: str | None = None
+    rng: random.Random = field(default_factory=lambda: random.Random(7))
+
+    def ticket_id(self) -> int:
+        return self.rng.choice(self.ticket_ids)
+
+def _import_file(ctx: Context):
+    rows = ["subject,requester_email,status", *(f"Benchmark import {i},admin@example.com,open" for i in range(20))]
+    return {"files": {"file": ("bench.csv", "\n".join(rows).encode())}}
+
+# /api/tickets/stream is left out: it holds the connection open and only ever
+# ends when the client leaves, so it has no per-request latency to measure
+SCENARIOS = [
+    Scenario("GET /api/users/me", "GET", lambda ctx: ("/api/users/me", {})),
+    Scenario("GET /api/users/public", "GET", lambda ctx: ("/api/users/public", {}), auth=False),
+    Scenario("GET /api/users/", "GET", lambda ctx: ("/api/users/", {})),
+    Scenario("GET /api/users/{id}", "GET", lambda ctx: (f"/api/users/{ctx.rng.choice(ctx.user_ids)}", {})),
+    Scenario("GET /api/users/{id}/summary", "GET",
+             lambda ctx: (f"/api/users/{ctx.rng.choice(ctx.user_ids)}/summary", {})),
+    Scenario("GET /api/tickets/", "GET", lambda ctx: ("/api/tickets/", {"params": {"limit": 100}})),
+    Scenario("GET /api/tickets/?view=my_inbox", "GET",
+             lambda ctx: ("/api/tickets/", {"params": {"limit": 100, "view": "my_inbox"}})),
+    Scenario("GET /api/tickets/?view=unsolved", "GET",
+             lambda ctx: ("/api/tickets/", {"params": {"limit": 100, "view": "unsolved"}})),
+    Scenario("GET /api/tickets/?view=pending", "GET",
+             lambda ctx: ("/api/tickets/", {"params": {"limit": 100, "view": "pending"}})),
+    Scenario("GET /api/tickets/?skip=5000", "GET",
+             lambda ctx: ("/api/tickets/", {"params": {"limit": 100, "skip": 5000}})),
+    Scenario("GET /api/tickets/search", "GET",
+             lambda ctx: ("/api/tickets/search", {"params": {"q": ctx.rng.choice(["bankex", "payment", "refund", "login err"])}})),
+    Scenario("GET /api/tickets/{id}", "GET", lambda ctx: (f"/api/tickets/{ctx.ticket_id()}", {})),
+    Scenario("GET /api/tickets/stats/counts", "GET", lambda ctx: ("/api/tickets/stats/counts", {})),
+    Scenario("GET /api/tickets/changes", "GET", lambda ctx: ("/api/tickets/changes", {})),
+    Scenario("GET /api/tickets/changes?since=", "GET",
+             lambda ctx: ("/api/tickets/changes", {"params": {"since": ctx.changes_token}})),
+    Scenario("GET /api/tickets/export", "GET",
+             lambda ctx: ("/api/tickets/export", {"params": {"format": "ndjson", "view": "pending"}}), max_requests=5),
+    Scenario("POST /api/tickets/", "POST",
+             lambda ctx: ("/api/tickets/", {"json": {"subject": "Benchmark ticket", "description": "Created by load_test"}})),
+    Scenario("PATCH /api/tickets/{id}", "PATCH",
+             lambda ctx: (f"/api/tickets/{ctx.ticket_id()}", {"json": {"priority": ctx.rng.choice(["low", "high"])}})),
+    Scenario("PATCH /api/tickets/bulk", "PATCH",
+             lambda ctx: ("/api/tickets/bulk", {"json": {"ids": ctx.rng.sample(ctx.ticket_ids, min(100, len(ctx.ticket_ids))),
+                                                          "update": {"priority": "medium"}}}), max_requests=50),
+    Scenario("DELETE /api/tickets/{id}", "DELETE",
+             lambda ctx: (f"/api/tickets/{ctx.created_ids.pop()}", {})),
+    Scenario("POST /api/tickets/import", "POST", lambda ctx: ("/api/tickets/import", _import_file(ctx)), max_requests=10),
+    Scenario("POST /api/auth/login", "POST",
+             lambda ctx: ("/api/auth/login", {"data": {"username": "admin", "password": "admin123"}}),
+             max_requests=20, auth=False),
+    Scenario("POST /api/auth/register", "POST",
+             lambda ctx: ("/api/auth/register", {"json": {"email": f"{uuid.uuid4().hex}@bench.local",
+                                                          "username": uuid.uuid4().hex, "password": "password123"}}),
+             max_requests=20, auth=False),
+    Scenario("GET /api/auth/cache-stats", "GET", lambda ctx: ("/api/auth/cache-stats", {})),
+]
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, ctx: Context, headers: dict,
+                       requests: int, concurrency: int, counter: QueryCounter | None) -> dict:
+    latencies = []
+    statuses = {}
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            path, kwargs = scenario.build(ctx)
+            started = time.perf_counter()
+            response = await client.request(scenario.method, path, headers=headers if scenario.auth else None, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if scenario.name == "POST /api/tickets/" and response.status_code == 200:
+                ctx.created_ids.append(response.json()["id"])
+
+    queries_before = counter.count if counter else 0
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = lambda seconds: round(seconds * 1000, 3)
+    return {
+        "requests": len(latencies),
+        "errors": sum(count for status, count in statuses.items() if status >= 400),
+        "status_codes": {str(status): count for status, count in sorted(statuses.items())},
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "mean_ms": ms(sum(latencies) / len(latencies)) if latencies else 0.0,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "queries_per_request": round((counter.count - queries_before) / len(latencies), 2)
+        if counter and latencies else None,
+    }
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def run(args) -> dict:
+    counter = None
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+    else:
+        # database.py and routers/auth.py read these at import time
+        os.environ["DATABASE_URL"] = args.database_url
+        os.environ["DB_MODE"] = args.db_mode
+        # Every request comes from one client, so the login rate limits would turn most logins into 429s
+        os.environ["HASH_RATE_PER_IP"] = "0"
+        os.environ["HASH_RATE_PER_USERNAME"] = "0"
+        from sqlalchemy import event
+
+        import database
+        from bootstrap import init_database
+        from main import app
+
+        # httpx's ASGI transport doesn't run the lifespan startup hook
+        init_database()
+
+        counter = QueryCounter()
+        event.listen(database.engine, "before_cursor_execute", counter)
+        if database.async_engine is not None:
+            event.listen(database.async_engine.sync_engine, "before_cursor_execute", counter)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark",
+                                   timeout=args.timeout)
+
+    async with client:
+        login = await client.post("/api/auth/login", data={"username": args.username, "password": args.password})
+        login.raise_for_status()
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        ctx = Context()
+        page = await client.get("/api/tickets/", params={"limit": 100}, headers=headers)
+        ctx.ticket_ids = [ticket["id"] for ticket in page.json()]
+        ctx.user_ids = [user["id"] for user in (await client.get("/api/users/public")).json()]
+        ctx.changes_token = (await client.get("/api/tickets/changes", headers=headers)).json()["next_token"]
+        if not ctx.ticket_ids:
+            raise SystemExit("No tickets to benchmark, generate a dataset first")
+
+        selected = [s for s in SCENARIOS if not args.routes or any(r in s.name for r in args.routes)]
+        results = {}
+        for scenario in selected:
+            requests = min(args.requests, scenario.max_requests or args.requests)
+            if scenario.name.startswith("DELETE"):
+                requests = min(requests, len(ctx.created_ids))
+            if requests == 0:
+                continue
+            result = await run_scenario(client, scenario, ctx, headers, requests,
+                                        min(args.concurrency, requests), counter)
+            results[scenario.name] = result
+            qpr = result["queries_per_request"]
+            print(f"{scenario.name:<40} p50 {result['p50_ms']:>9.2f}ms  p95 {result['p95_ms']:>9.2f}ms  "
+                  f"p99 {result['p99_ms']:>9.2f}ms  {result['throughput_rps']:>8.1f} req/s  "
+                  f"sql/req {qpr if qpr is not None else '-'}  errors {result['errors']}")
+
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "target": args.url or args.database_url,
+            "db_mode": None if args.url else args.db_mode,
+            "concurrency": args.concurrency,
+            "requests_per_route": args.requests,
+        },
+        "routes": results,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test every API route")
+    parser.add_argument("--database-url", default="sqlite:///./bench.db",
+                        help="Database for the in-process app (ignored with --url)")
+    parser.add_argument("--db-mode", choices=["sync", "async"], default=os.getenv("DB_MODE", "sync"))
+    parser.add_argument("--url", help="Benchmark a running server instead, e.g. http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per route")
+    parser.add_argument("--routes", nargs="*", help="Only run scenarios whose name contains one of these")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--out", help="Results file (default: benchmarks/results/<timestamp>-<commit>.json)")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    out = args.out or os.path.join(
+        os.path.dirname(__file__), "results",
+        f"{report['meta']['timestamp'].replace(':', '')}-{report['meta']['commit'] or 'nocommit'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {out}")
+
+if __name__ == "__main__":
+    main()
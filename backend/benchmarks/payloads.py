@@ -0,0 +1,143 @@
+"""
+Measure response encoding: bytes on the wire and CPU per request
+Run this from the backend directory against a generated database:
+    python -m benchmarks.payloads --database-url sqlite:///./bench.db --requests 200
+
+Two parts, both in-process:
+- encode: CPU to turn one list page into JSON, FastAPI's validate + serialize +
+  json.dumps path against orjson on the already-built payload (`prevalidated`)
+- wire: the list routes through the whole app with each Accept-Encoding,
+  reporting compressed bytes and process CPU time per request
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from typing import List
+
+import httpx
+
+from benchmarks.load_test import git_commit
+
+ROUTES = {
+    "GET /api/tickets/?limit=100": ("/api/tickets/", {"limit": 100}),
+    "GET /api/tickets/?limit=1000": ("/api/tickets/", {"limit": 1000}),
+    "GET /api/users/": ("/api/users/", {}),
+}
+ENCODINGS = ["identity", "gzip", "br"]
+
+def cpu_per_call_ms(fn, repeat: int) -> float:
+    started = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return round((time.process_time() - started) / repeat * 1000, 3)
+
+def encode_report(payload: list, model, repeat: int) -> dict:
+    """FastAPI's response_model path vs orjson on the same payload"""
+    import orjson
+    from pydantic import TypeAdapter
+
+    adapter = TypeAdapter(List[model])
+
+    def validated():
+        content = adapter.dump_python(adapter.validate_python(payload), mode="json")
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def prevalidated():
+        return orjson.dumps(payload)
+
+    return {
+        "validated_json_ms": cpu_per_call_ms(validated, repeat),
+        "prevalidated_orjson_ms": cpu_per_call_ms(prevalidated, repeat),
+        "bytes": len(prevalidated()),
+    }
+
+async def wire_report(client: httpx.AsyncClient, headers: dict, path: str, params: dict, requests: int) -> dict:
+    report = {}
+    for encoding in ENCODINGS:
+        request_headers = {**headers, "Accept-Encoding": encoding}
+        wire_bytes = 0
+        started = time.process_time()
+        for _ in range(requests):
+            response = await client.get(path, params=params, headers=request_headers)
+            response.raise_for_status()
+            wire_bytes = response.num_bytes_downloaded
+        report[encoding] = {
+            "content_encoding": response.headers.get("content-encoding", "identity"),
+            "wire_bytes": wire_bytes,
+            "cpu_ms_per_request": round((time.process_time() - started) / requests * 1000, 3),
+        }
+    return report
+
+async def run(args) -> dict:
+    # database.py reads this at import time
+    os.environ["DATABASE_URL"] = args.database_url
+    from bootstrap import init_database
+    from database import SessionLocal
+    from main import app
+    from models import User
+    from routers.tickets import TicketResponse, serialize_ticket, ticket_query
+    from routers.users import USER_FIELDS, UserResponse
+
+    # httpx's ASGI transport doesn't run the lifespan startup hook
+    init_database()
+
+    db = SessionLocal()
+    try:
+        ticket_page = [serialize_ticket(ticket) for ticket in ticket_query(db).limit(100)]
+        users = [dict(zip(USER_FIELDS, row)) for row in db.query(*(getattr(User, f) for f in USER_FIELDS))]
+    finally:
+        db.close()
+    encode = {
+        "tickets x100": encode_report(ticket_page, TicketResponse, args.requests),
+        f"users x{len(users)}": encode_report(users, UserResponse, args.requests),
+    }
+    for name, result in encode.items():
+        print(f"encode {name:<28} validated+json {result['validated_json_ms']:>8.3f}ms  "
+              f"prevalidated orjson {result['prevalidated_orjson_ms']:>8.3f}ms  {result['bytes']:>9} bytes")
+
+    wire = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark") as client:
+        login = await client.post("/api/auth/login", data={"username": args.username, "password": args.password})
+        login.raise_for_status()
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        for name, (path, params) in ROUTES.items():
+            wire[name] = await wire_report(client, headers, path, params, args.requests)
+            for encoding, result in wire[name].items():
+                print(f"wire   {name:<28} {encoding:<9} {result['wire_bytes']:>9} bytes  "
+                      f"{result['cpu_ms_per_request']:>8.3f}ms CPU/request")
+
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "target": args.database_url,
+            "requests": args.requests,
+        },
+        "encode": encode,
+        "wire": wire,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare JSON encoding and compression of list responses")
+    parser.add_argument("--database-url", default="sqlite:///./bench.db")
+    parser.add_argument("--requests", type=int, default=200, help="Repetitions per measurement")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--out", help="Results file (default: benchmarks/results/payloads-<timestamp>-<commit>.json)")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    out = args.out or os.path.join(
+        os.path.dirname(__file__), "results",
+        f"payloads-{report['meta']['timestamp'].replace(':', '')}-{report['meta']['commit'] or 'nocommit'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Measure cold start: importing the app and initialising a fresh or existing database
+Run this from the backend directory:
+    python -m benchmarks.startup --runs 5 --import-budget-ms 1500
+
+Every measurement runs in a fresh interpreter so nothing is already imported
+or cached. Exits with status 1 when the median import time is over budget,
+so it can gate CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Each snippet prints the seconds it took
+IMPORT_APP = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+INIT_DATABASE = (
+    "import time; from bootstrap import init_database; "
+    "t = time.perf_counter(); init_database(); print(time.perf_counter() - t)"
+)
+
+def timed(snippet: str, database_url: str) -> float:
+    env = {**os.environ, "DATABASE_URL": database_url}
+    result = subprocess.run([sys.executable, "-c", snippet], env=env, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+def summary(samples: list[float]) -> dict:
+    ms = [round(sample * 1000, 1) for sample in samples]
+    return {"median_ms": round(statistics.median(ms), 1), "min_ms": min(ms), "max_ms": max(ms)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure app import and database initialisation time")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=1500.0,
+                        help="Fail when the median time to import main exceeds this")
+    parser.add_argument("--out", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    imports, cold, warm = [], [], []
+    with tempfile.TemporaryDirectory() as workdir:
+        for run in range(args.runs):
+            database_url = f"sqlite:///{os.path.join(workdir, f'startup{run}.db')}"
+            imports.append(timed(IMPORT_APP, database_url))
+            cold.append(timed(INIT_DATABASE, database_url))
+            warm.append(timed(INIT_DATABASE, database_url))
+
+    report = {
+        "import_main": summary(imports),
+        "init_database_fresh": summary(cold),
+        "init_database_existing": summary(warm),
+        "import_budget_ms": args.import_budget_ms,
+    }
+    for name in ("import_main", "init_database_fresh", "init_database_existing"):
+        result = report[name]
+        print(f"{name:<24} median {result['median_ms']:>8.1f}ms  min {result['min_ms']:>8.1f}ms  "
+              f"max {result['max_ms']:>8.1f}ms")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if report["import_main"]["median_ms"] > args.import_budget_ms:
+        print(f"Importing the app took longer than the {args.import_budget_ms:.0f}ms budget")
+        sys.exit(1)
+    print(f"Import time is within the {args.import_budget_ms:.0f}ms budget")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+One-off database initialisation: schema, seed data, search index and counters.
+
+Runs from `python manage.py init-db` or, unless INIT_DB_ON_STARTUP=0, from the
+app's startup hook instead of at import time. Workers starting together take
+a lock first so only one of them creates tables and seeds.
+"""
+from contextlib import contextmanager
+import hashlib
+import os
+import re
+import tempfile
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateIndex
+
+from counters import setup_ticket_counters
+from database import Base, SessionLocal, engine as default_engine
+from models import User, Ticket, TicketStatus, TicketPriority
+from search import setup_search_index
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: single-process dev servers don't need the lock
+    fcntl = None
+
+INIT_DB_ON_STARTUP = os.getenv("INIT_DB_ON_STARTUP", "1").lower() not in ("0", "false", "no")
+# Arbitrary key for pg_advisory_lock
+INIT_LOCK_KEY = 7_316_002
+
+# Pre-computed bcrypt hashes of the well-known seed passwords, so seeding a
+# fresh database doesn't spend a second of CPU hashing them
+SEED_PASSWORD_HASHES = {
+    "admin123": "$2b$12$32TPKIz8gLf1GjaJgcdUCOSG2VxssQNrmc1MoMd3BBgZPkMGKLKIC",
+    "Toni123": "$2b$12$mfMm66qHESPdco6h/GzC0uSzHP96ct2QGt5YumNHLgiRTGSlVjwW.",
+    "password123": "$2b$12$HQ8Rh.F7LMv6aSuXJS9P0eA9VJw9IgX2VwWYfu8CZRHr/ZwgsLVW2",
+}
+
+SEED_USERS = [
+    {"email": "admin@example.com", "username": "admin", "full_name": "Admin User", "password": "admin123", "is_admin": 1},
+    {"email": "toni@example.com", "username": "toni", "full_name": "Toni", "password": "Toni123", "is_admin": 1},
+    {"email": "sarah.chen@example.com", "username": "sarah.chen", "full_name": "Sarah Chen"},
+    {"email": "mike.wilson@example.com", "username": "mike.wilson", "full_name": "Mike Wilson"},
+    {"email": "emma.davis@example.com", "username": "emma.davis", "full_name": "Emma Davis"},
+    {"email": "john.smith@example.com", "username": "john.smith", "full_name": "John Smith"},
+    {"email": "lisa.johnson@example.com", "username": "lisa.johnson", "full_name": "Lisa Johnson"},
+    {"email": "david.brown@example.com", "username": "david.brown", "full_name": "David Brown"},
+    {"email": "jennifer.lee@example.com", "username": "jennifer.lee", "full_name": "Jennifer Lee"},
+    {"email": "robert.taylor@example.com", "username": "robert.taylor", "full_name": "Robert Taylor"},
+]
+
+SEED_TICKETS = [
+    {"number": "28371", "subject": "BankEx ID: 2835726/16146490 - Bankruptcy", "status": TicketStatus.OPEN, "priority": TicketPriority.HIGH, "requester_idx": 1, "assignee_idx": 0},
+    {"number": "28372", "subject": "Payment Issue - Account Review Required", "status": TicketStatus.PENDING, "priority": TicketPriority.MEDIUM, "requester_idx": 2, "assignee_idx": 0},
+    {"number": "28373", "subject": "BankEx ID: 2833871/16135965 - Consumer Proposal", "status": TicketStatus.RESOLVED, "priority": TicketPriority.LOW, "requester_idx": 1, "assignee_idx": 0},
+    {"number": "28374", "subject": "Login Authentication Error - Unable to Access Dashboard", "status": TicketStatus.OPEN, "priority": TicketPriority.HIGH, "requester_idx": 3, "assignee_idx": 1},
+    {"number": "28375", "subject": "Data Export Feature Request - CSV Format", "status": TicketStatus.PENDING, "priority": TicketPriority.LOW, "requester_idx": 4, "assignee_idx": 0},
+    {"number": "28376", "subject": "BankEx ID: 2839012/16152334 - Account Closure", "status": TicketStatus.OPEN, "priority": TicketPriority.MEDIUM, "requester_idx": 5, "assignee_idx": 1},
+    {"number": "28377", "subject": "Password Reset Not Working - Email Not Received", "status": TicketStatus.RESOLVED, "priority": TicketPriority.HIGH, "requester_idx": 6, "assignee_idx": 0},
+    {"number": "28378", "subject": "Report Generation Timeout - Large Dataset", "status": TicketStatus.PENDING, "priority": TicketPriority.MEDIUM, "requester_idx": 7, "assignee_idx": 1},
+    {"number": "28379", "subject": "BankEx ID: 2841567/16158901 - Debt Consolidation", "status": TicketStatus.OPEN, "priority": TicketPriority.HIGH, "requester_idx": 2, "assignee_idx": 0},
+    {"number": "28380", "subject": "User Permission Issue - Cannot View Reports", "status": TicketStatus.PENDING, "priority": TicketPriority.MEDIUM, "requester_idx": 8, "assignee_idx": 1},
+    {"number": "28381", "subject": "API Integration Error - Third Party Service", "status": TicketStatus.OPEN, "priority": TicketPriority.HIGH, "requester_idx": 3, "assignee_idx": 0},
+    {"number": "28382", "subject": "BankEx ID: 2843298/16163445 - Payment Plan Setup", "status": TicketStatus.RESOLVED, "priority": TicketPriority.LOW, "requester_idx": 4, "assignee_idx": 1},
+]
+
+@contextmanager
+def init_lock(engine: Engine):
+    """Serialise initialisation across processes sharing the database"""
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as conn:
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": INIT_LOCK_KEY})
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": INIT_LOCK_KEY})
+        return
+
+    path = engine.url.database
+    if fcntl is None or not path or path == ":memory:":
+        yield
+        return
+    # In the temp dir rather than next to the database, named after the database
+    # so every process opening the same file takes the same lock
+    digest = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:16]
+    with open(os.path.join(tempfile.gettempdir(), f"ticket-system-init-{digest}.lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def create_schema(engine: Engine):
+    # New tables come with their indexes; indexes added to an existing table are
+    # left to create_indexes_online, since a plain CREATE INDEX blocks its writes
+    Base.metadata.create_all(bind=engine)
+
+def missing_ticket_indexes(engine: Engine) -> list[str]:
+    existing = {index["name"] for index in inspect(engine).get_indexes(Ticket.__tablename__)}
+    return [index.name for index in Ticket.__table__.indexes if index.name not in existing]
+
+def create_indexes_online(engine: Engine) -> list[str]:
+    """
+    Add any missing ticket indexes to a live database, returning their names.
+    PostgreSQL builds them CONCURRENTLY so writes carry on meanwhile; SQLite
+    has no online build, so each one holds the write lock while it is created.
+    Finishes with ANALYZE: without statistics SQLite prefers the status index
+    plus a sort over the partial index for the unsolved view.
+    """
+    created = []
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        postgres = conn.dialect.name == "postgresql"
+        if postgres:
+            # An interrupted concurrent build leaves an invalid index behind that IF NOT EXISTS would skip
+            invalid = set(conn.execute(text(
+                "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE NOT i.indisvalid"
+            )).scalars())
+        existing = {index["name"] for index in inspect(conn).get_indexes(Ticket.__tablename__)}
+
+        for index in Ticket.__table__.indexes:
+            if postgres and index.name in invalid:
+                conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+                existing.discard(index.name)
+            if index.name in existing:
+                continue
+            ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=conn.dialect))
+            if postgres:
+                ddl = re.sub(r"^CREATE (UNIQUE )?INDEX", r"CREATE \1INDEX CONCURRENTLY", ddl)
+            conn.execute(text(ddl))
+            created.append(index.name)
+        conn.execute(text(f"ANALYZE {Ticket.__tablename__}"))
+    return created
+
+def seed_data(engine: Engine) -> bool:
+    """Insert the default users and tickets into an empty database, in one transaction"""
+    db = SessionLocal(bind=engine)
+    try:
+        if db.query(User.id).filter(User.username == "admin").first():
+            return False
+
+        users = [
+            User(
+                email=u["email"],
+                username=u["username"],
+                hashed_password=SEED_PASSWORD_HASHES[u.get("password", "password123")],
+                full_name=u["full_name"],
+                is_admin=u.get("is_admin", 0)
+            )
+            for u in SEED_USERS
+        ]
+        db.add_all(users)
+        # Assigns the user ids the tickets reference
+        db.flush()
+
+        db.add_all([
+            Ticket(
+                ticket_number=t["number"],
+                subject=t["subject"],
+                status=t["status"],
+                priority=t["priority"],
+                requester_id=users[t["requester_idx"]].id,
+                assignee_id=users[t["assignee_idx"]].id
+            )
+            for t in SEED_TICKETS
+        ])
+        db.commit()
+        print("Database seeded successfully!")
+        return True
+    finally:
+        db.close()
+
+def init_database(engine: Engine = default_engine) -> list[str]:
+    """Returns the ticket indexes still missing, for `manage.py create-indexes` to add"""
+    with init_lock(engine):
+        create_schema(engine)
+        seed_data(engine)
+        # Runs after seeding so a fresh database starts with its tickets indexed and counted
+        setup_search_index(engine)
+        setup_ticket_counters(engine)
+        return missing_ticket_indexes(engine)
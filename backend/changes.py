@@ -0,0 +1,62 @@
+"""
+Commit-time stamps for the /changes feed.
+
+The feed walks tickets by (updated_at, id) and tombstones by (deleted_at, id).
+It can only promise never to skip a row if each row's stamp is taken when its
+transaction commits. A bulk update or an import batch stamped when it started
+could otherwise commit behind rows the feed has already reported. Tickets and
+tombstones written through the ORM are tracked here automatically. Core
+statements register the ticket ids they wrote with mark_tickets_changed. A
+before_commit hook then restamps everything the transaction touched.
+"""
+from datetime import datetime
+import os
+
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+
+from database import IN_LIST_CHUNK
+from models import Ticket, TicketTombstone
+
+# Tombstones older than this may be pruned, so older /changes tokens must resync
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "30"))
+
+def mark_tickets_changed(db: Session, ticket_ids):
+    """Record tickets written with Core statements, so their commit stamps updated_at"""
+    db.info.setdefault("changed_ticket_ids", set()).update(ticket_ids)
+
+@event.listens_for(Session, "after_flush")
+def _track_changed_rows(session, flush_context):
+    tickets = session.info.setdefault("changed_ticket_ids", set())
+    tombstones = session.info.setdefault("new_tombstone_ids", set())
+    for obj in session.new:
+        if isinstance(obj, Ticket):
+            tickets.add(obj.id)
+        elif isinstance(obj, TicketTombstone):
+            tombstones.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, Ticket):
+            tickets.add(obj.id)
+
+@event.listens_for(Session, "before_commit")
+def _stamp_at_commit(session):
+    # Pending objects are flushed after this hook runs, too late to be tracked
+    session.flush()
+    now = datetime.utcnow()
+    for model, column, key in (
+        (Ticket, Ticket.updated_at, "changed_ticket_ids"),
+        (TicketTombstone, TicketTombstone.deleted_at, "new_tombstone_ids"),
+    ):
+        ids = sorted(session.info.pop(key, ()))
+        for start in range(0, len(ids), IN_LIST_CHUNK):
+            session.execute(
+                update(model)
+                .where(model.id.in_(ids[start:start + IN_LIST_CHUNK]))
+                .values({column: now})
+                .execution_options(synchronize_session=False)
+            )
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_rows(session):
+    session.info.pop("changed_ticket_ids", None)
+    session.info.pop("new_tombstone_ids", None)
@@ -0,0 +1,49 @@
+"""
+Script to check that ticket endpoints issue a fixed number of SQL queries
+Run this from the backend directory: python check_query_counts.py
+"""
+import asyncio
+import sys
+
+# Points the app at a throwaway database, so it comes before anything that imports database.py
+from checks_common import count_queries, seed
+
+from fastapi import Response
+
+from database import Database, SessionLocal, engine, Base
+from routers.tickets import TicketListFilters, get_tickets, get_ticket
+
+PAGE_SIZES = [1, 10, 100]
+
+def main():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        current_user = seed(db, users=20, tickets=max(PAGE_SIZES))[0]
+
+        counts = {}
+        for size in PAGE_SIZES:
+            db.expunge_all()
+            counts[size] = count_queries(lambda: asyncio.run(
+                get_tickets(
+                    Response(), limit=size, sort="-created_at", filters=TicketListFilters(status=None, priority=None),
+                    if_none_match=None, database=Database(db), current_user=current_user
+                )
+            ))
+            print(f"get_tickets limit={size}: {counts[size]} queries")
+
+        db.expunge_all()
+        detail = count_queries(lambda: asyncio.run(
+            get_ticket(1, Response(), if_none_match=None, database=Database(db), current_user=current_user)
+        ))
+        print(f"get_ticket: {detail} queries")
+    finally:
+        db.close()
+
+    if len(set(counts.values())) != 1 or detail != 1:
+        print("FAIL: query count grows with page size")
+        sys.exit(1)
+    print("OK: query count is independent of page size")
+
+if __name__ == "__main__":
+    main()
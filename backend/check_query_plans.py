@@ -0,0 +1,103 @@
+"""
+Script to check that the ticket list and count queries are served from indexes
+Run this from the backend directory: python check_query_plans.py
+
+Runs EXPLAIN QUERY PLAN on every statement get_tickets (each view and common
+filter combination, with and without a cursor) and get_ticket_counts issue,
+and fails if any of them scans a whole table or sorts through a temp B-tree.
+"""
+import asyncio
+from datetime import datetime
+import sys
+
+# Points the app at a throwaway database, so it comes before anything that imports database.py
+from checks_common import record_statements, seed
+
+from fastapi import Response
+
+from bootstrap import create_indexes_online, create_schema
+from counters import rebuild_ticket_counters
+from database import Database, SessionLocal, engine
+from models import UNSOLVED_STATUSES, Ticket, TicketStatus, TicketPriority
+from routers.tickets import TicketListFilters, encode_cursor, get_tickets, get_ticket_counts
+
+# Filter combinations that must page straight off an index in the default newest-first sort
+FILTERS = {
+    "all": {},
+    "view=my_inbox": {"view": "my_inbox"},
+    "view=unsolved": {"view": "unsolved"},
+    "view=pending": {"view": "pending"},
+    "status=open": {"status": [TicketStatus.OPEN]},
+    "status=unsolved statuses": {"status": UNSOLVED_STATUSES},
+    "view=my_inbox status=open": {"view": "my_inbox", "status": [TicketStatus.OPEN]},
+    "view=unsolved status=open": {"view": "unsolved", "status": [TicketStatus.OPEN]},
+    "view=pending status=open": {"view": "pending", "status": [TicketStatus.OPEN]},
+    "requester_id": {"requester_id": 1},
+    "requester_id status=open": {"requester_id": 1, "status": [TicketStatus.OPEN]},
+    "requester_id created_from": {"requester_id": 1, "created_from": datetime(2020, 1, 1)},
+    "assignee_id": {"assignee_id": 1},
+    "assignee_id priority=high": {"assignee_id": 1, "priority": [TicketPriority.HIGH]},
+    "priority=high": {"priority": [TicketPriority.HIGH]},
+    "created_from created_to": {"created_from": datetime(2020, 1, 1), "created_to": datetime(2100, 1, 1)},
+}
+# Bounded by statuses x assignees and read in full by design; CONSTANT is the
+# one-row FROM-less select the list ETag watermark is built on
+SCANNABLE_TABLES = {"ticket_counters", "CONSTANT"}
+
+def plan_problems(db, statement: str, parameters) -> tuple[list[str], list[str]]:
+    """The query plan's detail lines, and those that are a full scan or a temp B-tree"""
+    plan = [row[3] for row in db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+    problems = []
+    for line in plan:
+        words = line.split()
+        if "TEMP B-TREE" in line:
+            problems.append(line)
+        # "SCAN t USING INDEX ix" walks an index in sort order and stops at the LIMIT
+        elif words[0] == "SCAN" and "INDEX" not in words and words[1] not in SCANNABLE_TABLES:
+            problems.append(line)
+    return plan, problems
+
+def main():
+    create_schema(engine)
+    db = SessionLocal()
+    try:
+        current_user = seed(db, users=10, tickets=200)[0]
+        rebuild_ticket_counters(db)
+        # Load the user again after the commits so it stays usable once expunged
+        db.refresh(current_user)
+        cursor_ticket = db.query(Ticket).order_by(Ticket.id).offset(100).first()
+        # Plans as they are after the create-indexes migration, which gathers statistics
+        create_indexes_online(engine)
+        cursor = encode_cursor(cursor_ticket)
+
+        cases = {}
+        for label, params in FILTERS.items():
+            for page_cursor in (None, cursor):
+                filters = TicketListFilters(**{"status": None, "priority": None, **params})
+                cases[f"get_tickets {label} cursor={bool(page_cursor)}"] = (
+                    lambda filters=filters, page_cursor=page_cursor: asyncio.run(get_tickets(
+                        Response(), limit=50, cursor=page_cursor, sort="-created_at", filters=filters,
+                        if_none_match=None, database=Database(db), current_user=current_user
+                    ))
+                )
+        cases["get_ticket_counts"] = lambda: asyncio.run(
+            get_ticket_counts(database=Database(db), current_user=current_user)
+        )
+
+        failures = 0
+        for name, call in cases.items():
+            db.expunge_all()
+            for statement, parameters in record_statements(call):
+                plan, problems = plan_problems(db, statement, parameters)
+                print(f"{'FAIL' if problems else 'ok  '} {name}: {'; '.join(plan)}")
+                failures += bool(problems)
+    finally:
+        db.close()
+
+    if failures:
+        print(f"FAIL: {failures} statements scan a table or sort without an index")
+        sys.exit(1)
+    print("OK: every ticket list and count query is index-backed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Script to check that imported ticket numbers never collide with allocated ones
+Run this from the backend directory: python check_ticket_numbers.py
+
+Imports tickets that bring their own numbers from inside a block this worker
+has already reserved, and from inside a block another worker reserved, then
+creates tickets through the endpoint and fails if any create errors or a
+number is handed out twice.
+"""
+import asyncio
+import io
+import json
+import sys
+
+# Points the app at a throwaway database, so it comes before anything that imports database.py
+import checks_common
+
+from sqlalchemy import select
+
+from bootstrap import init_database
+from database import Database, SessionLocal, engine
+from models import Ticket, User
+from routers import tickets
+from ticket_import import import_tickets
+from ticket_numbers import TicketNumberAllocator, numeric_part
+
+CREATES_PER_CASE = 3
+
+def import_numbers(db, numbers: list[str]) -> dict:
+    rows = [
+        {"subject": f"Imported {number}", "requester_email": "admin@example.com", "ticket_number": number}
+        for number in numbers
+    ]
+    stream = io.BytesIO("".join(json.dumps(row) + "\n" for row in rows).encode())
+    return import_tickets(db, stream, "ndjson")
+
+def create_tickets(db, current_user, count: int) -> list[str]:
+    created = []
+    for i in range(count):
+        ticket = asyncio.run(tickets.create_ticket(
+            tickets.TicketCreate(subject=f"Created {i}"), database=Database(db), current_user=current_user
+        ))
+        created.append(ticket["ticket_number"])
+    return created
+
+def main():
+    init_database(engine)
+    db = SessionLocal()
+    failures = []
+    try:
+        current_user = db.query(User).filter(User.username == "admin").one()
+
+        cases = {}
+        # This worker's own block: the numbers right after the one it just handed out
+        first = numeric_part(create_tickets(db, current_user, 1)[0])
+        cases["own block"] = [f"{first + 1}", f"#{first + 2}", f"{first + 3}"]
+        # Another worker's block, reserved before the import and still unused
+        other_worker = TicketNumberAllocator()
+        start = other_worker.allocate(db)
+        cases["other worker's block"] = [f"#{start + 1}", f"#{start + 2}", f"#{start + 3}"]
+
+        for label, numbers in cases.items():
+            if label == "other worker's block":
+                tickets.ticket_numbers = other_worker
+            report = import_numbers(db, numbers)
+            if report["imported"] != len(numbers):
+                failures.append(f"{label}: import failed: {report['errors']}")
+                continue
+            try:
+                created = create_tickets(db, current_user, CREATES_PER_CASE)
+            except Exception as e:
+                db.rollback()
+                failures.append(f"{label}: create failed: {e!r}")
+                continue
+            print(f"{label}: imported {', '.join(numbers)}, then created {', '.join(created)}")
+
+        all_numbers = [numeric_part(number) for number in db.execute(select(Ticket.ticket_number)).scalars()]
+        if len(all_numbers) != len(set(all_numbers)):
+            failures.append("a ticket number was used twice")
+    finally:
+        db.close()
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print("OK: imported ticket numbers are never handed out again")
+
+if __name__ == "__main__":
+    main()
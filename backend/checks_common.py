@@ -0,0 +1,59 @@
+"""
+Shared setup for the check_*.py scripts.
+
+Importing this points the app at a throwaway database, so the scripts import
+it before anything that imports database.py.
+"""
+import os
+import tempfile
+
+tmp_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{tmp_dir}/check.db"
+
+from sqlalchemy import event
+
+from database import engine
+from models import Ticket, TicketPriority, TicketStatus, User
+
+class StatementRecorder:
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append((statement, parameters))
+
+def record_statements(fn) -> list:
+    """(statement, parameters) of every SQL statement fn runs"""
+    recorder = StatementRecorder()
+    event.listen(engine, "before_cursor_execute", recorder)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", recorder)
+    return recorder.statements
+
+def count_queries(fn) -> int:
+    return len(record_statements(fn))
+
+def seed(db, users: int, tickets: int) -> list[User]:
+    """Users and tickets spread over every status and priority, some of them unassigned"""
+    seeded = [
+        User(email=f"user{i}@example.com", username=f"user{i}", hashed_password="x", full_name=f"User {i}")
+        for i in range(users)
+    ]
+    db.add_all(seeded)
+    db.flush()
+    statuses = list(TicketStatus)
+    priorities = list(TicketPriority)
+    for i in range(tickets):
+        db.add(Ticket(
+            ticket_number=f"#{933000 + i}",
+            subject=f"Ticket {i}",
+            status=statuses[i % len(statuses)],
+            priority=priorities[i % len(priorities)],
+            requester_id=seeded[i % users].id,
+            # Leave some tickets unassigned so both join branches are exercised
+            assignee_id=seeded[(i * 7) % users].id if i % 3 else None
+        ))
+    db.commit()
+    return seeded
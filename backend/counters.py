@@ -0,0 +1,161 @@
+"""
+Ticket counters backing /api/tickets/stats/counts and /api/users/{id}/summary.
+
+Each ticket write adjusts one ticket_counters row per (status, assignee) it
+enters or leaves, in the same transaction, so reading the dashboard counts
+never scans the tickets table. user_ticket_counters does the same per
+(user, role, status, priority) for the requester's and assignee's profiles.
+"""
+from sqlalchemy import func, case
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, upsert_insert
+from models import UNSOLVED_STATUSES, Ticket, TicketCounter, TicketPriority, TicketStatus, UserTicketCounter
+
+# The two sides of a ticket a user can be on, as stored in user_ticket_counters.role
+USER_ROLES = {"requested": Ticket.requester_id, "assigned": Ticket.assignee_id}
+
+def _add_to_counter(db: Session, model, key: dict, delta: int):
+    """Atomically add delta to the counter row with primary key `key`, creating it if needed"""
+    insert = upsert_insert(db.get_bind().dialect.name)
+    stmt = insert(model).values(**key, count=delta)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(key),
+        set_={"count": model.count + stmt.excluded.count}
+    )
+    db.execute(stmt)
+
+def adjust_ticket_counter(db: Session, status: TicketStatus, assignee_id: int | None, delta: int):
+    """Atomically add delta to the counter for (status, assignee_id)"""
+    _add_to_counter(db, TicketCounter, {"status": status, "assignee_id": assignee_id or 0}, delta)
+
+def move_ticket_counter(
+    db: Session,
+    old: tuple[TicketStatus, int | None],
+    new: tuple[TicketStatus, int | None]
+):
+    """Move a ticket from one (status, assignee_id) bucket to another"""
+    if old == new:
+        return
+    adjust_ticket_counter(db, *old, -1)
+    adjust_ticket_counter(db, *new, 1)
+
+def user_bucket(ticket) -> tuple:
+    """The (requester_id, assignee_id, status, priority) a ticket or ticket row counts under"""
+    return (ticket.requester_id, ticket.assignee_id, ticket.status, ticket.priority)
+
+def adjust_user_ticket_counters(db: Session, bucket: tuple, delta: int):
+    """Add delta to the requester's and the assignee's counters for tickets in bucket"""
+    requester_id, assignee_id, status, priority = bucket
+    for role, user_id in (("requested", requester_id), ("assigned", assignee_id)):
+        if user_id is not None:
+            key = {"user_id": user_id, "role": role, "status": status, "priority": priority}
+            _add_to_counter(db, UserTicketCounter, key, delta)
+
+def move_user_ticket_counters(db: Session, old: tuple, new: tuple, count: int = 1):
+    """Move count tickets from one user_bucket to another"""
+    if old == new:
+        return
+    adjust_user_ticket_counters(db, old, -count)
+    adjust_user_ticket_counters(db, new, count)
+
+def read_ticket_counts(db: Session, user_id: int) -> dict:
+    """Dashboard counts in one pass over the (small) counters table"""
+    total, my_inbox, open_tickets, unsolved = db.query(
+        func.sum(TicketCounter.count),
+        func.sum(case((TicketCounter.assignee_id == user_id, TicketCounter.count), else_=0)),
+        func.sum(case((TicketCounter.status == TicketStatus.OPEN, TicketCounter.count), else_=0)),
+        func.sum(case((TicketCounter.status.in_(UNSOLVED_STATUSES), TicketCounter.count), else_=0))
+    ).one()
+    return {
+        "total": total or 0,
+        "my_inbox": my_inbox or 0,
+        "open": open_tickets or 0,
+        "unsolved": unsolved or 0
+    }
+
+def read_user_ticket_summary(db: Session, user_id: int) -> dict:
+    """Per-status and per-priority counts for each role, from at most 40 counter rows"""
+    summary = {
+        role: {
+            "total": 0,
+            "by_status": {status.value: 0 for status in TicketStatus},
+            "by_priority": {priority.value: 0 for priority in TicketPriority}
+        }
+        for role in USER_ROLES
+    }
+    rows = db.query(
+        UserTicketCounter.role, UserTicketCounter.status, UserTicketCounter.priority, UserTicketCounter.count
+    ).filter(UserTicketCounter.user_id == user_id)
+    for role, status, priority, count in rows:
+        counts = summary[role]
+        counts["total"] += count
+        counts["by_status"][status.value] += count
+        counts["by_priority"][priority.value] += count
+    return summary
+
+def derive_ticket_counters(db: Session) -> dict:
+    """Count tickets per (status, assignee_id) with a single GROUP BY pass"""
+    rows = db.query(Ticket.status, Ticket.assignee_id, func.count(Ticket.id)).group_by(
+        Ticket.status, Ticket.assignee_id
+    ).all()
+    return {(status, assignee_id or 0): count for status, assignee_id, count in rows}
+
+def check_ticket_counters(db: Session) -> list[tuple]:
+    """Return (status, assignee_id, stored, actual) for every counter that disagrees with the tickets table"""
+    actual = derive_ticket_counters(db)
+    stored = {(c.status, c.assignee_id): c.count for c in db.query(TicketCounter)}
+    mismatches = []
+    for status, assignee_id in sorted(set(actual) | set(stored), key=lambda k: (k[0].value, k[1])):
+        key = (status, assignee_id)
+        if stored.get(key, 0) != actual.get(key, 0):
+            mismatches.append((status, assignee_id, stored.get(key, 0), actual.get(key, 0)))
+    return mismatches
+
+def derive_user_ticket_counters(db: Session) -> dict:
+    """Count tickets per (user_id, role, status, priority) with one GROUP BY pass per role"""
+    counts = {}
+    for role, column in USER_ROLES.items():
+        rows = db.query(column, Ticket.status, Ticket.priority, func.count(Ticket.id)).filter(
+            column.isnot(None)
+        ).group_by(column, Ticket.status, Ticket.priority)
+        for user_id, status, priority, count in rows:
+            counts[(user_id, role, status, priority)] = count
+    return counts
+
+def check_user_ticket_counters(db: Session) -> list[tuple]:
+    """Return (user_id, role, status, priority, stored, actual) for every per-user counter that is off"""
+    actual = derive_user_ticket_counters(db)
+    stored = {(c.user_id, c.role, c.status, c.priority): c.count for c in db.query(UserTicketCounter)}
+    mismatches = []
+    for key in sorted(set(actual) | set(stored), key=lambda k: (k[0], k[1], k[2].value, k[3].value)):
+        if stored.get(key, 0) != actual.get(key, 0):
+            mismatches.append((*key, stored.get(key, 0), actual.get(key, 0)))
+    return mismatches
+
+def rebuild_ticket_counters(db: Session) -> int:
+    """Replace all counters with values re-derived from the tickets table; returns tickets counted"""
+    actual = derive_ticket_counters(db)
+    db.query(TicketCounter).delete()
+    db.add_all(
+        TicketCounter(status=status, assignee_id=assignee_id, count=count)
+        for (status, assignee_id), count in actual.items()
+    )
+    db.query(UserTicketCounter).delete()
+    db.add_all(
+        UserTicketCounter(user_id=user_id, role=role, status=status, priority=priority, count=count)
+        for (user_id, role, status, priority), count in derive_user_ticket_counters(db).items()
+    )
+    db.commit()
+    return sum(actual.values())
+
+def setup_ticket_counters(engine: Engine):
+    """Populate the counters the first time they are used against an existing database"""
+    db = SessionLocal(bind=engine)
+    try:
+        missing = db.query(TicketCounter).first() is None or db.query(UserTicketCounter).first() is None
+        if missing and db.query(Ticket).first() is not None:
+            rebuild_ticket_counters(db)
+    finally:
+        db.close()
@@ -1,19 +1,111 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./tickets.db")
+# "sync" runs database work on the threadpool, "async" on the event loop via aiosqlite/asyncpg
+DB_MODE = os.getenv("DB_MODE", "sync").lower()
+# "default" keeps driver defaults; "production" tunes SQLite pragmas or the connection pool
+DB_PROFILE = os.getenv("DB_PROFILE", "default").lower()
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Ids per IN list in set-based statements, well under SQLite's bound parameter limit
+IN_LIST_CHUNK = 5000
+
+def is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+def upsert_insert(dialect: str):
+    """The dialect's insert(), which supports ON CONFLICT clauses"""
+    if dialect == "postgresql":
+        return postgresql.insert
+    if dialect == "sqlite":
+        return sqlite.insert
+    raise ValueError(f"No ON CONFLICT insert for the {dialect} dialect")
+
+def engine_options(url: str, profile: str = DB_PROFILE) -> dict:
+    """create_engine keyword arguments for a DATABASE_URL under a profile"""
+    in_memory = is_sqlite(url) and url.partition(":///")[2] in ("", ":memory:")
+    if profile != "production" or in_memory:
+        return {}
+    # Also matters for SQLite: once threads outnumber pooled connections, writers
+    # can starve waiting for a checkout while readers keep grabbing them
+    options = {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW}
+    if not is_sqlite(url):
+        # Drop connections the server or a proxy closed while they sat idle
+        options.update(pool_pre_ping=True, pool_recycle=DB_POOL_RECYCLE)
+    return options
+
+def sqlite_pragmas(profile: str = DB_PROFILE) -> list[str]:
+    if profile != "production":
+        return []
+    return [
+        # Readers no longer block the writer (and vice versa)
+        "PRAGMA journal_mode=WAL",
+        # Safe with WAL: a power loss can only lose the last commits, never corrupt
+        "PRAGMA synchronous=NORMAL",
+        # Negative cache_size is in KiB
+        f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}",
+        f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+        f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+    ]
+
+def apply_profile(engine, profile: str = DB_PROFILE):
+    """Run the profile's pragmas on every new SQLite connection of engine (sync or async's sync_engine)"""
+    pragmas = sqlite_pragmas(profile) if engine.dialect.name == "sqlite" else []
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+def create_database_engine(url: str, profile: str = DB_PROFILE):
+    engine = create_engine(
+        url, connect_args={"check_same_thread": False} if is_sqlite(url) else {}, **engine_options(url, profile)
+    )
+    apply_profile(engine, profile)
+    return engine
+
+engine = create_database_engine(DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Called as hook(conn, cursor, statement, parameters, executemany, seconds) after every statement
+statement_hooks = []
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the statement's own context, so one that fails leaves nothing behind
+    context.query_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context.query_started
+    for hook in statement_hooks:
+        hook(conn, cursor, statement, parameters, executemany, elapsed)
+
+def time_statements(engine):
+    """Time every statement run through engine and pass it to statement_hooks"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+time_statements(engine)
+
 Base = declarative_base()
 
 def get_db():
@@ -22,3 +114,54 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def async_database_url(url: str) -> str:
+    """Swap the DATABASE_URL driver for its asyncio counterpart"""
+    scheme, _, rest = url.partition("://")
+    drivers = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg", "postgres": "postgresql+asyncpg"}
+    return f"{drivers.get(scheme.split('+')[0], scheme)}://{rest}"
+
+async_engine = None
+AsyncSessionLocal = None
+if DB_MODE == "async":
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    # aiosqlite opens a connection per checkout (NullPool), so only server databases get pool options
+    async_engine = create_async_engine(
+        async_database_url(DATABASE_URL), **({} if is_sqlite(DATABASE_URL) else engine_options(DATABASE_URL))
+    )
+    apply_profile(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False)
+    time_statements(async_engine.sync_engine)
+
+class Database:
+    """
+    Request-scoped handle that runs ORM code written against a plain Session.
+
+    In sync mode the code runs on a threadpool worker. In async mode it runs on
+    the event loop through AsyncSession.run_sync, so every statement awaits the
+    driver instead of holding a thread while it waits on the database.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    async def run(self, fn, *args, **kwargs):
+        """Call fn(session, *args, **kwargs) without blocking the event loop"""
+        if AsyncSessionLocal is not None:
+            return await self.session.run_sync(fn, *args, **kwargs)
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+async def get_database():
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as session:
+            yield Database(session)
+    else:
+        db = SessionLocal()
+        try:
+            yield Database(db)
+        finally:
+            await run_in_threadpool(db.close)
+
+# The same Database outside a request's dependencies, e.g. to finish with it before a long-lived stream starts
+database_session = asynccontextmanager(get_database)
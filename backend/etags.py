@@ -0,0 +1,27 @@
+"""
+Weak ETags and If-None-Match handling for conditional GETs.
+
+Handlers compute an ETag from cheap version data (a row's updated_at, a
+table watermark) before loading or serializing anything, and answer a
+matching If-None-Match with an empty 304.
+"""
+import hashlib
+
+from fastapi import Response
+
+def weak_etag(*parts) -> str:
+    """Weak validator over the given version parts"""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison against an If-None-Match header value (a list of ETags or *)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
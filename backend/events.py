@@ -0,0 +1,100 @@
+"""
+In-process broadcast of ticket changes to /api/tickets/stream subscribers.
+
+The ticket endpoints publish from the event loop after their transaction
+commits. Each event is encoded once and shared by every subscriber whose
+view it touches. A subscriber holds at most STREAM_QUEUE_SIZE pending events;
+a client that falls further behind has its backlog dropped and receives a
+`resync` event telling it to refetch, so idle or slow connections cost a
+bounded amount of memory. Events reach subscribers of this process only.
+"""
+import asyncio
+import itertools
+import json
+import os
+
+from fastapi.encoders import jsonable_encoder
+
+from counters import UNSOLVED_STATUSES
+from models import TicketStatus
+
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "64"))
+STREAM_MAX_SUBSCRIBERS = int(os.getenv("STREAM_MAX_SUBSCRIBERS", "10000"))
+# Comments keep idle connections open through proxies that time out silent ones
+STREAM_HEARTBEAT_SECONDS = 15
+
+HEARTBEAT = b": keepalive\n\n"
+RESYNC = b"event: resync\ndata: {}\n\n"
+# Also flushes the response headers as soon as the stream opens
+RETRY = b"retry: 5000\n\n"
+
+def bucket_in_view(view: str | None, user_id: int, status, assignee_id) -> bool:
+    """Python twin of ticket_filters for a single (status, assignee_id)"""
+    if view == "my_inbox":
+        return assignee_id == user_id
+    if view == "unsolved":
+        return status in UNSOLVED_STATUSES
+    if view == "pending":
+        return status == TicketStatus.PENDING
+    return True
+
+class Subscriber:
+    __slots__ = ("view", "user_id", "queue")
+
+    def __init__(self, view: str | None, user_id: int):
+        self.view = view
+        self.user_id = user_id
+        self.queue = asyncio.Queue(STREAM_QUEUE_SIZE)
+
+    def wants(self, buckets) -> bool:
+        if buckets is None:
+            return True
+        return any(bucket_in_view(self.view, self.user_id, status, assignee_id) for status, assignee_id in buckets)
+
+    def offer(self, message: bytes):
+        if self.queue.full():
+            # Too far behind: drop the backlog rather than buffer without bound
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            message = RESYNC
+        self.queue.put_nowait(message)
+
+class TicketBroadcaster:
+    def __init__(self):
+        self.subscribers: set[Subscriber] = set()
+        self._ids = itertools.count(1)
+
+    def full(self) -> bool:
+        return len(self.subscribers) >= STREAM_MAX_SUBSCRIBERS
+
+    def publish(self, event: str, data, buckets=None):
+        """
+        Send an event to the subscribers whose view contains any of buckets,
+        the (status, assignee_id) pairs the change moved tickets out of or
+        into; None reaches everyone. Must be called on the event loop.
+        """
+        if not self.subscribers:
+            return
+        message = (
+            f"id: {next(self._ids)}\nevent: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+        ).encode()
+        for subscriber in list(self.subscribers):
+            if subscriber.wants(buckets):
+                subscriber.offer(message)
+
+    async def stream(self, view: str | None, user_id: int):
+        """Server-sent events for one subscriber until the client disconnects"""
+        # Registered on first iteration, so a response that never starts can't leak a subscriber
+        subscriber = Subscriber(view, user_id)
+        self.subscribers.add(subscriber)
+        try:
+            yield RETRY
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscriber.queue.get(), STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield HEARTBEAT
+        finally:
+            self.subscribers.discard(subscriber)
+
+broadcaster = TicketBroadcaster()
@@ -1,108 +1,59 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from database import engine, Base, SessionLocal
+from fastapi.responses import ORJSONResponse
+from starlette.concurrency import run_in_threadpool
+from database import engine, async_engine, statement_hooks
 from routers import tickets, auth, users
-from models import User, Ticket, TicketStatus, TicketPriority
-from passlib.context import CryptContext
-import os
+from bootstrap import INIT_DB_ON_STARTUP, init_database
+from compression import CompressionMiddleware
+import metrics
+import passwords
+import profiling
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Registered before startup runs, but seeding happens outside any request so it isn't counted
+statement_hooks.append(metrics.record_statement)
+statement_hooks.append(profiling.record_statement)
+metrics.instrument_engine(engine)
+if async_engine is not None:
+    metrics.instrument_engine(async_engine.sync_engine)
+metrics.register(metrics.Counter(
+    "user_cache_hits_total", "Token lookups served from the user cache",
+    collect=lambda: {(): auth.user_cache.stats()["hits"]}
+))
+metrics.register(metrics.Counter(
+    "user_cache_misses_total", "Token lookups that went to the database",
+    collect=lambda: {(): auth.user_cache.stats()["misses"]}
+))
+metrics.register(metrics.Counter(
+    "password_attempts_limited_total", "Logins and registrations refused with a 429, by limit",
+    labels=("limit",),
+    collect=lambda: {("ip",): auth.ip_limiter.limited, ("username",): auth.username_limiter.limited}
+))
+metrics.register(metrics.Counter(
+    "password_hash_busy_total", "Password hashes refused because the hashing pool was saturated",
+    collect=lambda: {(): passwords.busy_total}
+))
 
-# Seed default data
-def seed_data():
-    db = SessionLocal()
-    try:
-        # Check if admin user exists
-        admin = db.query(User).filter(User.username == "admin").first()
-        if not admin:
-            pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema and seed data are set up here rather than at import time, so importing
+    # the app stays fast; deployments can run `python manage.py init-db` and set INIT_DB_ON_STARTUP=0
+    if INIT_DB_ON_STARTUP:
+        missing = await run_in_threadpool(init_database)
+        if missing:
+            # Building them here would block writes to a live table until done
+            print(f"Ticket indexes missing: {', '.join(missing)}. Run `python manage.py create-indexes` to add them.")
+    passwords.start_pool()
+    yield
+    passwords.shutdown_pool()
 
-            # Create admin user
-            admin = User(
-                email="admin@example.com",
-                username="admin",
-                hashed_password=pwd_context.hash("admin123"),
-                full_name="Admin User",
-                is_admin=1
-            )
-            db.add(admin)
-            db.commit()
-            db.refresh(admin)
-
-            # Create toni user
-            toni = User(
-                email="toni@example.com",
-                username="toni",
-                hashed_password=pwd_context.hash("Toni123"),
-                full_name="Toni",
-                is_admin=1
-            )
-            db.add(toni)
-            db.commit()
-            db.refresh(toni)
-
-            # Create sample users
-            users_data = [
-                {"email": "sarah.chen@example.com", "username": "sarah.chen", "full_name": "Sarah Chen"},
-                {"email": "mike.wilson@example.com", "username": "mike.wilson", "full_name": "Mike Wilson"},
-                {"email": "emma.davis@example.com", "username": "emma.davis", "full_name": "Emma Davis"},
-                {"email": "john.smith@example.com", "username": "john.smith", "full_name": "John Smith"},
-                {"email": "lisa.johnson@example.com", "username": "lisa.johnson", "full_name": "Lisa Johnson"},
-                {"email": "david.brown@example.com", "username": "david.brown", "full_name": "David Brown"},
-                {"email": "jennifer.lee@example.com", "username": "jennifer.lee", "full_name": "Jennifer Lee"},
-                {"email": "robert.taylor@example.com", "username": "robert.taylor", "full_name": "Robert Taylor"},
-            ]
-
-            created_users = [admin, toni]
-            for u in users_data:
-                user = User(
-                    email=u["email"],
-                    username=u["username"],
-                    hashed_password=pwd_context.hash("password123"),
-                    full_name=u["full_name"],
-                    is_admin=0
-                )
-                db.add(user)
-                db.commit()
-                db.refresh(user)
-                created_users.append(user)
-
-            # Create sample tickets with variety
-            tickets_data = [
-                {"number": "28371", "subject": "BankEx ID: 2835726/16146490 - Bankruptcy", "status": TicketStatus.OPEN, "priority": TicketPriority.HIGH, "requester_idx": 1, "assignee_idx": 0},
-                {"number": "28372", "subject": "Payment Issue - Account Review Required", "status": TicketStatus.PENDING, "priority": TicketPriority.MEDIUM, "requester_idx": 2, "assignee_idx": 0},
-                {"number": "28373", "subject": "BankEx ID: 2833871/16135965 - Consumer Proposal", "status": TicketStatus.RESOLVED, "priority": TicketPriority.LOW, "requester_idx": 1, "assignee_idx": 0},
-                {"number": "28374", "subject": "Login Authentication Error - Unable to Access Dashboard", "status": TicketStatus.OPEN, "priority": TicketPriority.HIGH, "requester_idx": 3, "assignee_idx": 1},
-                {"number": "28375", "subject": "Data Export Feature Request - CSV Format", "status": TicketStatus.PENDING, "priority": TicketPriority.LOW, "requester_idx": 4, "assignee_idx": 0},
-                {"number": "28376", "subject": "BankEx ID: 2839012/16152334 - Account Closure", "status": TicketStatus.OPEN, "priority": TicketPriority.MEDIUM, "requester_idx": 5, "assignee_idx": 1},
-                {"number": "28377", "subject": "Password Reset Not Working - Email Not Received", "status": TicketStatus.RESOLVED, "priority": TicketPriority.HIGH, "requester_idx": 6, "assignee_idx": 0},
-                {"number": "28378", "subject": "Report Generation Timeout - Large Dataset", "status": TicketStatus.PENDING, "priority": TicketPriority.MEDIUM, "requester_idx": 7, "assignee_idx": 1},
-                {"number": "28379", "subject": "BankEx ID: 2841567/16158901 - Debt Consolidation", "status": TicketStatus.OPEN, "priority": TicketPriority.HIGH, "requester_idx": 2, "assignee_idx": 0},
-                {"number": "28380", "subject": "User Permission Issue - Cannot View Reports", "status": TicketStatus.PENDING, "priority": TicketPriority.MEDIUM, "requester_idx": 8, "assignee_idx": 1},
-                {"number": "28381", "subject": "API Integration Error - Third Party Service", "status": TicketStatus.OPEN, "priority": TicketPriority.HIGH, "requester_idx": 3, "assignee_idx": 0},
-                {"number": "28382", "subject": "BankEx ID: 2843298/16163445 - Payment Plan Setup", "status": TicketStatus.RESOLVED, "priority": TicketPriority.LOW, "requester_idx": 4, "assignee_idx": 1},
-            ]
-
-            for t in tickets_data:
-                ticket = Ticket(
-                    ticket_number=t["number"],
-                    subject=t["subject"],
-                    status=t["status"],
-                    priority=t["priority"],
-                    requester_id=created_users[t["requester_idx"]].id,
-                    assignee_id=created_users[t["assignee_idx"]].id
-                )
-                db.add(ticket)
-
-            db.commit()
-            print("Database seeded successfully!")
-    finally:
-        db.close()
-
-seed_data()
+app = FastAPI(
+    title="Ticket System API", version="1.0.0", lifespan=lifespan, default_response_class=ORJSONResponse
+)
 
-app = FastAPI(title="Ticket System API", version="1.0.0")
+# Inside CORS so profile responses still carry the CORS headers
+app.add_middleware(profiling.ProfilingMiddleware)
 
 # Configure CORS - allow all origins
 app.add_middleware(
@@ -111,7 +62,11 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
+# Inside metrics so response sizes are the bytes actually sent
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
 
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
@@ -125,3 +80,8 @@ def read_root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    # Renders on the event loop, the same thread that updates the series
+    return Response(metrics.render_metrics(), media_type="text/plain; version=0.0.4")
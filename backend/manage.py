@@ -0,0 +1,140 @@
+"""
+Maintenance commands for the ticket database
+Run this from the backend directory: python manage.py <command>
+"""
+import argparse
+import secrets
+import sys
+from datetime import datetime, timedelta
+
+from bootstrap import create_indexes_online, init_database
+from database import SessionLocal, engine, Base
+from search import setup_search_index, rebuild_search_index
+from counters import check_ticket_counters, check_user_ticket_counters, rebuild_ticket_counters
+from passwords import get_password_hash
+from ticket_import import IMPORT_BATCH_SIZE, detect_format, import_tickets
+from models import TicketTombstone
+from changes import TOMBSTONE_RETENTION_DAYS
+
+def init_db(args):
+    if init_database(engine):
+        # An upgraded database: add the new indexes online, once the init lock is released
+        create_indexes(args)
+    print("Database initialised")
+
+def create_indexes(args):
+    created = create_indexes_online(engine)
+    for name in created:
+        print(f"Created {name}")
+    print(f"{len(created)} ticket indexes created" if created else "Ticket indexes are up to date")
+
+def rebuild_search(args):
+    Base.metadata.create_all(bind=engine)
+    setup_search_index(engine)
+    db = SessionLocal()
+    try:
+        count = rebuild_search_index(db)
+        print(f"Search index rebuilt for {count} tickets")
+    finally:
+        db.close()
+
+def check_counters(args):
+    db = SessionLocal()
+    try:
+        mismatches = check_ticket_counters(db)
+        user_mismatches = check_user_ticket_counters(db)
+    finally:
+        db.close()
+    for status, assignee_id, stored, actual in mismatches:
+        print(f"{status.value} assignee={assignee_id}: stored {stored}, actual {actual}")
+    for user_id, role, status, priority, stored, actual in user_mismatches:
+        print(f"user={user_id} {role} {status.value}/{priority.value}: stored {stored}, actual {actual}")
+    mismatches += user_mismatches
+    if mismatches:
+        print(f"{len(mismatches)} ticket counters are out of date, run rebuild-counters")
+        sys.exit(1)
+    print("Ticket counters match the tickets table")
+
+def rebuild_counters(args):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        count = rebuild_ticket_counters(db)
+        print(f"Ticket counters rebuilt from {count} tickets")
+    finally:
+        db.close()
+
+def prune_tombstones(args):
+    db = SessionLocal()
+    try:
+        cutoff = datetime.utcnow() - timedelta(days=args.days)
+        count = db.query(TicketTombstone).filter(TicketTombstone.deleted_at < cutoff).delete(synchronize_session=False)
+        db.commit()
+        print(f"Pruned {count} ticket tombstones older than {args.days} days")
+    finally:
+        db.close()
+
+def import_ticket_file(args):
+    fmt = args.format or detect_format(args.path)
+    if fmt is None:
+        print("Cannot tell the format from the file name, pass --format csv or --format ndjson")
+        sys.exit(2)
+
+    Base.metadata.create_all(bind=engine)
+    password_hash = None
+    if args.create_users:
+        password_hash = get_password_hash(secrets.token_urlsafe(32))
+
+    db = SessionLocal()
+    try:
+        with open(args.path, "rb") as stream:
+            report = import_tickets(db, stream, fmt, args.batch_size, args.create_users, password_hash)
+    finally:
+        db.close()
+
+    for error in report["errors"]:
+        print(f"line {error['line']}: {error['error']}")
+    print(f"Imported {report['imported']} tickets, {report['failed']} rows failed")
+    if report["failed"]:
+        sys.exit(1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Ticket system maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser(
+        "init-db", help="Create tables and indexes, seed an empty database, set up search and counters"
+    ).set_defaults(func=init_db)
+    commands.add_parser(
+        "create-indexes", help="Add missing ticket indexes to a live database without blocking writes"
+    ).set_defaults(func=create_indexes)
+    commands.add_parser(
+        "rebuild-search-index", help="Re-derive the full-text search index from the tickets table"
+    ).set_defaults(func=rebuild_search)
+    commands.add_parser(
+        "check-counters", help="Compare the dashboard and per-user counters against the tickets table"
+    ).set_defaults(func=check_counters)
+    commands.add_parser(
+        "rebuild-counters", help="Re-derive the dashboard and per-user counters from the tickets table"
+    ).set_defaults(func=rebuild_counters)
+
+    prune_parser = commands.add_parser(
+        "prune-tombstones", help="Delete deletion records the /changes feed no longer needs"
+    )
+    prune_parser.add_argument("--days", type=int, default=TOMBSTONE_RETENTION_DAYS)
+    prune_parser.set_defaults(func=prune_tombstones)
+
+    import_parser = commands.add_parser("import-tickets", help="Bulk import tickets from a CSV or NDJSON file")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--format", choices=["csv", "ndjson"])
+    import_parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    import_parser.add_argument(
+        "--create-users", action="store_true", help="Create users for unknown requester/assignee emails"
+    )
+    import_parser.set_defaults(func=import_ticket_file)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
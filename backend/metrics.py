@@ -0,0 +1,190 @@
+"""
+Request and database metrics in Prometheus text format.
+
+The ASGI middleware runs on the event loop thread in both DB modes, so it
+updates the shared series without locks. SQL statements and pool checkouts
+are accounted to the request that issued them through a context variable,
+which follows the request into threadpool workers and SQLAlchemy's async
+greenlets; those only ever touch their own request's stats.
+"""
+from contextvars import ContextVar
+import time
+
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+class RequestStats:
+    __slots__ = ("statements", "sql_seconds", "pool_wait_seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+
+current_request: ContextVar[RequestStats | None] = ContextVar("current_request", default=None)
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, values)) + "}"
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple = (), collect=None):
+        self.name, self.help, self.label_names = name, help, labels
+        self.values: dict[tuple, float] = {}
+        # Optional callable returning {labels: value}, read at scrape time
+        self.collect = collect
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        if self.collect:
+            self.values = self.collect()
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in list(self.values.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+        return lines
+
+class Gauge(Counter):
+    def dec(self, labels: tuple = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: tuple, labels: tuple = ()):
+        self.name, self.help, self.buckets, self.label_names = name, help, buckets, labels
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self.series: dict[tuple, list] = {}
+
+    def observe(self, value: float, labels: tuple = ()):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+                break
+        else:
+            series[len(self.buckets)] += 1
+        series[-1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.label_names + ("le",)
+        for labels, series in list(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(names, labels + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+ROUTE_LABELS = ("method", "route")
+
+requests_total = Counter("http_requests_total", "HTTP requests by route and status code", ROUTE_LABELS + ("status",))
+request_duration = Histogram("http_request_duration_seconds", "Request latency", LATENCY_BUCKETS, ROUTE_LABELS)
+response_size = Histogram("http_response_size_bytes", "Response body size", SIZE_BUCKETS, ROUTE_LABELS)
+requests_in_flight = Gauge("http_requests_in_flight", "Requests currently being served")
+request_statements = Histogram(
+    "http_request_sql_statements", "SQL statements executed per request", STATEMENT_BUCKETS, ROUTE_LABELS
+)
+request_sql_seconds = Counter("http_request_sql_seconds_total", "Time spent waiting on SQL", ROUTE_LABELS)
+request_python_seconds = Counter(
+    "http_request_python_seconds_total", "Request time not spent in SQL", ROUTE_LABELS
+)
+pool_checkout_wait = Histogram(
+    "db_pool_checkout_wait_seconds", "Time each request waited for pool connections", LATENCY_BUCKETS
+)
+
+REGISTRY = [
+    requests_total, request_duration, response_size, requests_in_flight,
+    request_statements, request_sql_seconds, request_python_seconds, pool_checkout_wait,
+]
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+def record_statement(conn, cursor, statement, parameters, executemany, seconds):
+    """database.statement_hooks entry charging a statement to the current request"""
+    stats = current_request.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.sql_seconds += seconds
+
+def instrument_engine(engine: Engine):
+    """Time pool checkouts of an engine (pass async_engine.sync_engine for async)"""
+    pool = engine.pool
+    connect = pool.connect
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            # Checkouts happen on worker threads, so only touch the request's own stats here
+            stats = current_request.get()
+            if stats is not None:
+                stats.pool_wait_seconds += time.perf_counter() - started
+
+    pool.connect = timed_connect
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording per-route latency, size, status and SQL usage"""
+
+    def __init__(self, app, skip_paths: tuple = ("/metrics",)):
+        self.app = app
+        self.skip_paths = skip_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            requests_in_flight.dec()
+            current_request.reset(token)
+
+            # Label by route template, never the raw path, to keep cardinality bounded
+            route = scope.get("route")
+            labels = (scope["method"], route.path if route is not None else "unmatched")
+            requests_total.inc(labels + (str(status),))
+            request_duration.observe(elapsed, labels)
+            response_size.observe(size, labels)
+            request_statements.observe(stats.statements, labels)
+            request_sql_seconds.inc(labels, stats.sql_seconds)
+            request_python_seconds.inc(labels, max(elapsed - stats.sql_seconds, 0.0))
+            pool_checkout_wait.observe(stats.pool_wait_seconds)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, Enum as SQLEnum, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -11,6 +11,10 @@ class TicketStatus(str, enum.Enum):
     RESOLVED = "resolved"
     CLOSED = "closed"
 
+UNSOLVED_STATUSES = [TicketStatus.OPEN, TicketStatus.IN_PROGRESS, TicketStatus.PENDING]
+# Partial index predicate for the unsolved view; the enum is stored by member name
+UNSOLVED_INDEX_WHERE = "status IN (%s)" % ", ".join(f"'{status.name}'" for status in UNSOLVED_STATUSES)
+
 class TicketPriority(str, enum.Enum):
     LOW = "low"
     MEDIUM = "medium"
@@ -49,3 +53,63 @@ class Ticket(Base):
 
     requester = relationship("User", back_populates="tickets_created", foreign_keys=[requester_id])
     assignee = relationship("User", back_populates="tickets_assigned", foreign_keys=[assignee_id])
+
+    __table_args__ = (
+        # Matches the (created_at DESC, id DESC) sort used for keyset pagination
+        Index("ix_tickets_created_at_id", "created_at", "id"),
+        # max(updated_at) for the list ETag watermark, and the /changes feed's seek order
+        Index("ix_tickets_updated_at_id", "updated_at", "id"),
+        # One per list view and equality filter, each ending in the sort columns so a page
+        # is an index range walked in order: my_inbox / assignee_id, requester_id,
+        # pending / status, priority, and unsolved
+        Index("ix_tickets_assignee_created_at_id", "assignee_id", "created_at", "id"),
+        Index("ix_tickets_requester_created_at_id", "requester_id", "created_at", "id"),
+        Index("ix_tickets_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_tickets_priority_created_at_id", "priority", "created_at", "id"),
+        Index(
+            "ix_tickets_unsolved_created_at_id", "created_at", "id",
+            sqlite_where=text(UNSOLVED_INDEX_WHERE),
+            postgresql_where=text(UNSOLVED_INDEX_WHERE)
+        ),
+        # review_date range filters
+        Index("ix_tickets_review_date", "review_date"),
+    )
+
+class TicketCounter(Base):
+    """Ticket count per (status, assignee), maintained by the ticket write paths"""
+    __tablename__ = "ticket_counters"
+
+    status = Column(SQLEnum(TicketStatus), primary_key=True)
+    # 0 stands for unassigned so the pair can be a primary key
+    assignee_id = Column(Integer, primary_key=True, default=0)
+    count = Column(Integer, nullable=False, default=0)
+
+class UserTicketCounter(Base):
+    """Ticket count per (user, role, status, priority), maintained by the ticket write paths"""
+    __tablename__ = "user_ticket_counters"
+
+    user_id = Column(Integer, primary_key=True)
+    # "requested" or "assigned": the user's side of the ticket
+    role = Column(String, primary_key=True)
+    status = Column(SQLEnum(TicketStatus), primary_key=True)
+    priority = Column(SQLEnum(TicketPriority), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class NumberSequence(Base):
+    """Named counter row that hands out blocks of numbers (see ticket_numbers.py)"""
+    __tablename__ = "number_sequences"
+
+    name = Column(String, primary_key=True)
+    next_value = Column(Integer, nullable=False)
+
+class TicketTombstone(Base):
+    """Record of a deleted ticket, so the /changes feed can report deletions"""
+    __tablename__ = "ticket_tombstones"
+
+    id = Column(Integer, primary_key=True)
+    ticket_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_ticket_tombstones_deleted_at_id", "deleted_at", "id"),
+    )
@@ -0,0 +1,107 @@
+"""
+bcrypt hashing and verification, off the request path.
+
+A bcrypt call costs a few hundred milliseconds of CPU, so login and register
+run them in a pool of PASSWORD_HASH_WORKERS processes instead of on the
+threadpool every other endpoint shares. At most PASSWORD_HASH_QUEUE_SIZE calls
+are queued or running at once, and a call still waiting for a worker after
+PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS is given up with PasswordHasherBusy.
+PASSWORD_HASH_WORKERS=0 runs them on the threadpool instead.
+"""
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import os
+from threading import BoundedSemaphore, Lock
+
+from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "32"))
+PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS", "2"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+class PasswordHasherBusy(Exception):
+    """The hashing queue is full, or no worker became free within the queue timeout"""
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+def get_password_hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _ready() -> bool:
+    return True
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = Lock()
+_slots = BoundedSemaphore(max(PASSWORD_HASH_QUEUE_SIZE, 1))
+# Calls refused with PasswordHasherBusy, for /metrics
+busy_total = 0
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn rather than fork: the server's threads and open connections
+            # have no business being copied into the workers
+            _pool = ProcessPoolExecutor(PASSWORD_HASH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def start_pool():
+    """Start the workers in the background, so the first login doesn't wait for them to boot"""
+    if PASSWORD_HASH_WORKERS > 0:
+        pool = _get_pool()
+        for _ in range(PASSWORD_HASH_WORKERS):
+            pool.submit(_ready)
+
+def shutdown_pool():
+    with _pool_lock:
+        pool = _pool
+    if pool is not None:
+        _discard_pool(pool)
+
+async def _run(fn, *args):
+    global busy_total
+    if PASSWORD_HASH_WORKERS <= 0:
+        return await run_in_threadpool(fn, *args)
+    if not _slots.acquire(blocking=False):
+        busy_total += 1
+        raise PasswordHasherBusy()
+    try:
+        pool = _get_pool()
+        try:
+            future = pool.submit(fn, *args)
+            waiter = asyncio.wrap_future(future)
+            try:
+                # Shielded: timing out must not cancel a call a worker already started
+                return await asyncio.wait_for(asyncio.shield(waiter), PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                # Only succeeds while the call is still queued
+                if future.cancel():
+                    busy_total += 1
+                    raise PasswordHasherBusy()
+                return await waiter
+        except BrokenProcessPool:
+            # A worker died; the next call starts a fresh pool
+            _discard_pool(pool)
+            busy_total += 1
+            raise PasswordHasherBusy()
+    finally:
+        _slots.release()
+
+async def hash_password(password: str) -> str:
+    return await _run(get_password_hash, password)
+
+async def check_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run(verify_password, plain_password, hashed_password)
@@ -0,0 +1,211 @@
+"""
+Slow query log and opt-in per-request SQL profiles.
+
+Every statement is timed by database.py. Statements slower than
+SLOW_QUERY_MS are logged with their parameters and the route that issued
+them. Admins can send `X-Profile: 1` to get a breakdown of their request
+instead of its normal body: every statement with its timing and row count,
+plus the query plan of the slowest ones. Streamed responses (exports, event
+streams) and everyone else's responses pass through untouched.
+"""
+from contextvars import ContextVar
+import json
+import logging
+import os
+import time
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+
+import database
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# Statements kept per profile and how many of the slowest get EXPLAINed
+PROFILE_MAX_STATEMENTS = 500
+PROFILE_EXPLAIN_SLOWEST = 3
+# Larger response bodies are left out of the profile rather than parsed into it
+PROFILE_MAX_RESPONSE_BYTES = 1024 * 1024
+# Keeps log lines bounded for executemany batches and large IN lists
+MAX_LOGGED_PARAMS_LENGTH = 1000
+
+logger = logging.getLogger("sql.slow")
+
+class RequestProfile:
+    def __init__(self, scope, enabled: bool):
+        self.scope = scope
+        self.enabled = enabled
+        # Only admins get their breakdown, see authorize()
+        self.authorized = False
+        self.statements = []
+
+    @property
+    def route(self) -> str:
+        route = self.scope.get("route")
+        return route.path if route is not None else self.scope["path"]
+
+current_profile: ContextVar[RequestProfile | None] = ContextVar("current_profile", default=None)
+
+def authorize(user):
+    """Called once the request's user is known; profiles are only returned to admins"""
+    profile = current_profile.get()
+    if profile is not None:
+        profile.authorized = bool(user.is_admin)
+
+def _truncate(value) -> str:
+    text = repr(value)
+    if len(text) > MAX_LOGGED_PARAMS_LENGTH:
+        return text[:MAX_LOGGED_PARAMS_LENGTH] + "..."
+    return text
+
+def record_statement(conn, cursor, statement, parameters, executemany, seconds):
+    """database.statement_hooks entry for the slow query log and active profiles"""
+    profile = current_profile.get()
+    if seconds * 1000 >= SLOW_QUERY_MS:
+        logger.warning(
+            "slow query %.1fms route=%s params=%s sql=%s",
+            seconds * 1000, profile.route if profile else "-", _truncate(parameters), " ".join(statement.split())
+        )
+    if profile is not None and profile.enabled and len(profile.statements) < PROFILE_MAX_STATEMENTS:
+        profile.statements.append({
+            "engine": conn.engine,
+            "sql": statement,
+            "parameters": parameters,
+            "executemany": executemany,
+            "duration_ms": round(seconds * 1000, 3),
+            # DBAPI drivers report -1 for SELECTs; those are counted in _inspect
+            "rows": cursor.rowcount if cursor.rowcount >= 0 else None
+        })
+
+def _is_plain_select(entry: dict) -> bool:
+    sql = entry["sql"].lstrip().upper()
+    return not entry["executemany"] and sql.startswith("SELECT") and "FOR UPDATE" not in sql
+
+def _inspect(conn, entries: list[dict], explain: list[dict]):
+    """Count rows of SELECTs and attach query plans, on a connection of the statements' own engine"""
+    sqlite = conn.dialect.name == "sqlite"
+    for entry in entries:
+        if entry["rows"] is None and _is_plain_select(entry):
+            entry["rows"] = conn.exec_driver_sql(
+                f"SELECT count(*) FROM ({entry['sql']}) AS profiled", entry["parameters"]
+            ).scalar()
+    for entry in explain:
+        if _is_plain_select(entry):
+            rows = conn.exec_driver_sql(
+                ("EXPLAIN QUERY PLAN " if sqlite else "EXPLAIN ") + entry["sql"], entry["parameters"]
+            ).all()
+            entry["plan"] = [row[-1] for row in rows]
+
+async def build_report(profile: RequestProfile, status: int, seconds: float, body: bytes, content_type: str) -> dict:
+    entries = profile.statements
+    slowest = sorted(entries, key=lambda entry: entry["duration_ms"], reverse=True)[:PROFILE_EXPLAIN_SLOWEST]
+
+    # Re-running the statements happens after the response was built, so it never skews the timings
+    for engine in {entry["engine"] for entry in entries}:
+        mine = [entry for entry in entries if entry["engine"] is engine]
+        explain = [entry for entry in slowest if entry["engine"] is engine]
+        if database.async_engine is not None and engine is database.async_engine.sync_engine:
+            async with database.async_engine.connect() as conn:
+                await conn.run_sync(_inspect, mine, explain)
+        else:
+            def inspect_sync():
+                with engine.connect() as conn:
+                    _inspect(conn, mine, explain)
+            await run_in_threadpool(inspect_sync)
+
+    sql_ms = sum(entry["duration_ms"] for entry in entries)
+    statements = [
+        {
+            "sql": " ".join(entry["sql"].split()),
+            "parameters": _truncate(entry["parameters"]),
+            "duration_ms": entry["duration_ms"],
+            "rows": entry["rows"],
+            **({"plan": entry["plan"]} if "plan" in entry else {})
+        }
+        for entry in entries
+    ]
+    response = None
+    if content_type.startswith("application/json") and len(body) <= PROFILE_MAX_RESPONSE_BYTES:
+        try:
+            response = json.loads(body)
+        except ValueError:
+            pass
+    return {
+        "route": profile.route,
+        "status_code": status,
+        "duration_ms": round(seconds * 1000, 3),
+        "sql_ms": round(sql_ms, 3),
+        "python_ms": round(max(seconds * 1000 - sql_ms, 0.0), 3),
+        "statement_count": len(entries),
+        "statements_truncated": len(entries) >= PROFILE_MAX_STATEMENTS,
+        "statements": statements,
+        "response": response,
+        "response_omitted": response is None and len(body) > PROFILE_MAX_RESPONSE_BYTES
+    }
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware tagging statements with their request and serving X-Profile breakdowns"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        enabled = (b"x-profile", b"1") in scope["headers"]
+        profile = RequestProfile(scope, enabled)
+        token = current_profile.set(profile)
+        try:
+            if not enabled:
+                await self.app(scope, receive, send)
+                return
+
+            # Decided when the response starts, by which time the caller's user is known:
+            # only an admin's single-chunk response is held back to be replaced by a profile
+            held = {}
+            passthrough = False
+
+            async def hold(message):
+                nonlocal passthrough
+                if passthrough or message["type"] not in ("http.response.start", "http.response.body"):
+                    await send(message)
+                elif message["type"] == "http.response.start":
+                    content_type = Headers(raw=message.get("headers", [])).get("content-type", "")
+                    if not profile.authorized or content_type.startswith("text/event-stream"):
+                        passthrough = True
+                        await send(message)
+                    else:
+                        held["start"] = message
+                elif message.get("more_body", False):
+                    # Streamed: never buffered, so it goes out as it is produced
+                    passthrough = True
+                    await send(held.pop("start"))
+                    await send(message)
+                else:
+                    held["body"] = message.get("body", b"")
+
+            started = time.perf_counter()
+            await self.app(scope, receive, hold)
+            elapsed = time.perf_counter() - started
+        finally:
+            current_profile.reset(token)
+
+        if "body" not in held:
+            if "start" in held:
+                await send(held["start"])
+            return
+
+        start = held["start"]
+        headers = dict(start.get("headers", []))
+        body = held["body"]
+        report = await build_report(
+            profile, start["status"], elapsed, body, headers.get(b"content-type", b"").decode("latin-1")
+        )
+        payload = json.dumps(report, default=str).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())]
+        })
+        await send({"type": "http.response.body", "body": payload})
@@ -0,0 +1,50 @@
+"""
+In-process token-bucket rate limiting.
+"""
+from collections import OrderedDict
+from threading import Lock
+import time
+
+class TokenBucketLimiter:
+    """
+    Thread-safe per-key token buckets, each holding up to `burst` tokens and
+    refilled at `rate_per_minute`. Only the `max_keys` most recently used keys
+    are tracked; a forgotten key starts again with a full bucket.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int, max_keys: int = 10000):
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+        self.max_keys = max_keys
+        self.limited = 0
+        # key -> (tokens, monotonic time they were counted at)
+        self._buckets: OrderedDict = OrderedDict()
+        self._lock = Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0 and self.burst > 0
+
+    def acquire(self, key) -> float:
+        """Take a token for key: 0 if one was available, otherwise seconds until one is"""
+        if not self.enabled:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            tokens, counted_at = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - counted_at) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                self.limited += 1
+                wait = (1 - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
@@ -0,0 +1,41 @@
+"""
+JSON responses rendered with orjson.
+
+ORJSONResponse is the app's default response class. Payloads the server
+builds itself from database rows (serialize_ticket and friends) can go out
+through `prevalidated`, which also skips FastAPI's response_model validation
+and jsonable_encoder pass; the route's response_model still documents them.
+List endpoints also take a `?fields=` sparse fieldset, checked by parse_fields.
+"""
+from fastapi import HTTPException, Response
+from fastapi.responses import ORJSONResponse
+
+# Describe the body, which the injected response doesn't have
+_BODY_HEADERS = (b"content-length", b"content-type")
+
+def prevalidated(content, response: Response | None = None) -> ORJSONResponse:
+    """
+    Render content as-is, keeping any headers the endpoint set on its injected
+    `response` (FastAPI drops them when an endpoint returns a Response itself)
+    """
+    rendered = ORJSONResponse(content)
+    if response is not None:
+        rendered.raw_headers.extend(
+            (key, value) for key, value in response.raw_headers if key not in _BODY_HEADERS
+        )
+    return rendered
+
+def parse_fields(fields: str | None, allowed: list[str]) -> list[str] | None:
+    """
+    Validate a comma-separated `?fields=` sparse fieldset against allowed,
+    returning the names in allowed's order, or None when no fieldset was given
+    """
+    if fields is None:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    if not requested:
+        raise HTTPException(status_code=400, detail="No fields requested")
+    return [name for name in allowed if name in requested]
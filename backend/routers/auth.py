@@ -1,23 +1,73 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from pydantic import BaseModel
+import math
 import os
+import time
 
-from database import get_db
+from cache import TTLCache
+from database import Database, get_database
 from models import User
+from passwords import PasswordHasherBusy, check_password, hash_password
+from profiling import authorize
+from rate_limit import TokenBucketLimiter
 
 router = APIRouter()
 
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "1024"))
+# Password hashes per minute (and burst) allowed for one username and one client IP; 0 disables
+HASH_RATE_PER_USERNAME = float(os.getenv("HASH_RATE_PER_USERNAME", "10"))
+HASH_BURST_PER_USERNAME = int(os.getenv("HASH_BURST_PER_USERNAME", "5"))
+HASH_RATE_PER_IP = float(os.getenv("HASH_RATE_PER_IP", "60"))
+HASH_BURST_PER_IP = int(os.getenv("HASH_BURST_PER_IP", "20"))
+# Proxies in front of the app that each append to X-Forwarded-For; 0 when clients connect directly
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+# For endpoints that also accept the token elsewhere, e.g. a query parameter
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
+
+# Verified token -> column snapshot of its user, so authenticated calls skip the users lookup
+user_cache = TTLCache(USER_CACHE_MAX_SIZE, USER_CACHE_TTL_SECONDS)
+
+# Login and register attempts, each of which may cost a bcrypt call
+username_limiter = TokenBucketLimiter(HASH_RATE_PER_USERNAME, HASH_BURST_PER_USERNAME)
+ip_limiter = TokenBucketLimiter(HASH_RATE_PER_IP, HASH_BURST_PER_IP)
+
+USER_COLUMNS = [column.key for column in User.__table__.columns]
+# Changing any of these must not be masked by a cached snapshot
+AUTH_FIELDS = ("username", "hashed_password", "is_active", "is_admin")
+
+def invalidate_cached_user(user_id: int):
+    user_cache.delete_where(lambda snapshot: snapshot["id"] == user_id)
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_changed_users(session, flush_context):
+    changed = session.info.setdefault("changed_user_ids", set())
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            changed.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            state = inspect(obj)
+            if any(state.attrs[field].history.has_changes() for field in AUTH_FIELDS):
+                changed.add(obj.id)
+    for user_id in changed:
+        invalidate_cached_user(user_id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    # Again after commit, in case a request re-cached the old row in between
+    for user_id in session.info.pop("changed_user_ids", ()):
+        invalidate_cached_user(user_id)
 
 class Token(BaseModel):
     access_token: str
@@ -32,11 +82,36 @@ class UserCreate(BaseModel):
     password: str
     full_name: str | None = None
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+def client_ip(request: Request) -> str:
+    """
+    The address the nearest untrusted hop connected from. Entries left of the
+    ones our own proxies appended to X-Forwarded-For are whatever the client
+    sent, so they are never used.
+    """
+    host = request.client.host if request.client else "unknown"
+    if TRUSTED_PROXY_HOPS <= 0:
+        return host
+    hops = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+    # Fewer hops than proxies: the request didn't come through all of them
+    return hops[-TRUSTED_PROXY_HOPS] if len(hops) >= TRUSTED_PROXY_HOPS else host
+
+def limit_password_attempts(request: Request, username: str):
+    """429 once the client IP or the username is out of password attempts"""
+    # IP first, so spraying many usernames from one address doesn't drain their buckets
+    wait = ip_limiter.acquire(client_ip(request)) or username_limiter.acquire(username.lower())
+    if wait:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many attempts, retry later",
+            headers={"Retry-After": str(math.ceil(wait))},
+        )
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+async def run_password_hasher(call):
+    """Await a passwords.py call, turning a full hashing queue into a 503"""
+    try:
+        return await call
+    except PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail="Server busy, retry later", headers={"Retry-After": "1"})
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
@@ -48,12 +123,29 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def _attach_snapshot(db: Session, snapshot: dict) -> User:
+    # Make the snapshot a persistent row of this session without a SELECT
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
+async def get_current_user(token: str = Depends(oauth2_scheme), database: Database = Depends(get_database)):
+    return await user_for_token(token, database)
+
+async def user_for_token(token: str | None, database: Database) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    if not token:
+        raise credentials_exception
+    snapshot = user_cache.get(token)
+    if snapshot is not None:
+        user = await database.run(_attach_snapshot, snapshot)
+        authorize(user)
+        return user
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -63,43 +155,62 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.username == token_data.username).first()
+    user = await database.run(lambda db: db.query(User).filter(User.username == token_data.username).first())
     if user is None:
         raise credentials_exception
+
+    # Never cache a token past its own expiry
+    user_cache.set(
+        token,
+        {key: getattr(user, key) for key in USER_COLUMNS},
+        ttl=payload["exp"] - time.time() if "exp" in payload else None
+    )
+    authorize(user)
     return user
 
 @router.post("/register", response_model=Token)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, request: Request, database: Database = Depends(get_database)):
+    limit_password_attempts(request, user_data.username)
+
     # Check if user exists
-    db_user = db.query(User).filter(
+    db_user = await database.run(lambda db: db.query(User).filter(
         (User.email == user_data.email) | (User.username == user_data.username)
-    ).first()
+    ).first())
     if db_user:
         raise HTTPException(status_code=400, detail="Email or username already registered")
 
-    # Create new user
-    hashed_password = get_password_hash(user_data.password)
-    new_user = User(
-        email=user_data.email,
-        username=user_data.username,
-        hashed_password=hashed_password,
-        full_name=user_data.full_name
-    )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    # bcrypt is CPU bound, keep it off the event loop and the shared threadpool
+    hashed_password = await run_password_hasher(hash_password(user_data.password))
+
+    def create(db: Session):
+        # Create new user
+        new_user = User(
+            email=user_data.email,
+            username=user_data.username,
+            hashed_password=hashed_password,
+            full_name=user_data.full_name
+        )
+        db.add(new_user)
+        db.commit()
+
+    await database.run(create)
 
     # Create access token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": new_user.username}, expires_delta=access_token_expires
+        data={"sub": user_data.username}, expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login(
+    request: Request,
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    database: Database = Depends(get_database)
+):
+    limit_password_attempts(request, form_data.username)
+    user = await database.run(lambda db: db.query(User).filter(User.username == form_data.username).first())
+    if not user or not await run_password_hasher(check_password(form_data.password, user.hashed_password)):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -111,3 +222,10 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
         data={"sub": user.username}, expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
+
+@router.get("/cache-stats")
+async def get_cache_stats(current_user: User = Depends(get_current_user)):
+    """Hit/miss counters of the authenticated user cache (admins only)"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return user_cache.stats()
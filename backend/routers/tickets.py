@@ -1,16 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from pydantic import BaseModel
-from typing import List, Optional
-from datetime import datetime
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, UploadFile, File
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, Query as SAQuery, joinedload, aliased
+from sqlalchemy import bindparam, func, select, tuple_, update as sql_update
+from sqlalchemy.exc import IntegrityError
+from pydantic import BaseModel, Field
+from typing import Callable, List, Optional
+from collections import Counter
+from datetime import datetime, timedelta
+import base64
+import csv
+import io
+import json
+import os
+import secrets
 
-from database import get_db
-from models import Ticket, User, TicketStatus, TicketPriority
-from routers.auth import get_current_user
+from changes import TOMBSTONE_RETENTION_DAYS, mark_tickets_changed
+from database import IN_LIST_CHUNK, Database, SessionLocal, database_session, get_database
+from models import UNSOLVED_STATUSES, Ticket, TicketCounter, TicketTombstone, User, TicketStatus, TicketPriority
+from passwords import get_password_hash
+from routers.auth import get_current_user, optional_oauth2_scheme, user_for_token
+from search import search_tickets, index_ticket, reindex_tickets, remove_ticket
+from counters import (
+    adjust_ticket_counter, adjust_user_ticket_counters, move_ticket_counter, move_user_ticket_counters,
+    read_ticket_counts, user_bucket
+)
+from ticket_numbers import ticket_numbers
+from ticket_import import IMPORT_BATCH_SIZE, detect_format, import_tickets
+from etags import etag_matches, not_modified, weak_etag
+from events import broadcaster
+from responses import parse_fields, prevalidated
 
 router = APIRouter()
 
+# /changes only reports writes at least this old. Stamps are taken as each
+# transaction commits (changes.py), so this only has to cover the moment between
+# a stamp and its COMMIT, however long the transaction ran before it
+CHANGES_SETTLE_SECONDS = float(os.getenv("CHANGES_SETTLE_SECONDS", "2"))
+
 class TicketCreate(BaseModel):
     subject: str
     description: str | None = None
@@ -23,6 +50,13 @@ class TicketUpdate(BaseModel):
     priority: TicketPriority | None = None
     assignee_id: int | None = None
 
+class TicketBulkUpdate(BaseModel):
+    ids: List[int] | None = Field(None, max_length=IN_LIST_CHUNK * 2)
+    view: str | None = None
+    status: TicketStatus | None = None
+    update: TicketUpdate
+    return_ids: bool = False
+
 class TicketResponse(BaseModel):
     id: int
     ticket_number: str
@@ -41,184 +75,726 @@ class TicketResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class TicketChangesResponse(BaseModel):
+    created: List[TicketResponse]
+    updated: List[TicketResponse]
+    deleted: List[int]
+    next_token: str
+    has_more: bool
+
+TICKET_COLUMNS = [column.key for column in Ticket.__table__.columns]
+
+def ticket_query(db: Session) -> SAQuery:
+    """Base ticket query that loads requester and assignee in the same SELECT"""
+    return db.query(Ticket).options(joinedload(Ticket.requester), joinedload(Ticket.assignee))
+
+def stamp_tickets(db: Session, *conditions) -> datetime:
+    """
+    Set updated_at on the matching tickets as the transaction's first write, so
+    it holds their row locks (PostgreSQL) or the write lock (SQLite, which has
+    no SELECT ... FOR UPDATE) before their counter buckets are read
+    """
+    now = datetime.utcnow()
+    db.execute(
+        sql_update(Ticket).where(*conditions).values(updated_at=now).execution_options(synchronize_session=False)
+    )
+    return now
+
+def get_ticket_or_404(db: Session, ticket_id: int) -> Ticket:
+    ticket = ticket_query(db).filter(Ticket.id == ticket_id).first()
+    if not ticket:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    return ticket
+
+def serialize_user_summary(user: User | None) -> dict | None:
+    if user is None:
+        return None
+    return {
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "full_name": user.full_name
+    }
+
+def serialize_ticket(ticket: Ticket) -> dict:
+    """Project a ticket and its people into the TicketResponse shape"""
+    data = {key: getattr(ticket, key) for key in TICKET_COLUMNS}
+    data["requester"] = serialize_user_summary(ticket.requester)
+    data["assignee"] = serialize_user_summary(ticket.assignee)
+    return data
+
+# What ?fields= may name: the ticket's columns and its two nested people
+TICKET_FIELDS = TICKET_COLUMNS + ["requester", "assignee"]
+PERSON_FIELDS = ["id", "username", "email", "full_name"]
+
+def sparse_ticket_query(db: Session, fields: list[str], sort_key: str) -> tuple[SAQuery, Callable]:
+    """
+    A query for just the columns behind `fields`, outer-joining the requester
+    or assignee only when asked for, and a function projecting its rows into
+    that subset of the TicketResponse shape
+    """
+    ticket_keys = [key for key in TICKET_COLUMNS if key in fields]
+    # id and the sort column are always read, for the next page's cursor
+    columns = [getattr(Ticket, key) for key in TICKET_COLUMNS if key in fields or key in ("id", sort_key)]
+    people = [(name, aliased(User, name=name)) for name in ("requester", "assignee") if name in fields]
+    for name, person in people:
+        columns += [getattr(person, key).label(f"{name}__{key}") for key in PERSON_FIELDS]
+
+    query = db.query(*columns).select_from(Ticket)
+    for name, person in people:
+        query = query.outerjoin(person, getattr(Ticket, f"{name}_id") == person.id)
+
+    def project(row) -> dict:
+        data = {key: getattr(row, key) for key in ticket_keys}
+        for name, _ in people:
+            if getattr(row, f"{name}__id") is None:
+                data[name] = None
+            else:
+                data[name] = {key: getattr(row, f"{name}__{key}") for key in PERSON_FIELDS}
+        return data
+
+    return query, project
+
+def match_any(column, values: list):
+    """`column = value`, or an IN list inlined into the SQL so the planner can match partial indexes"""
+    if len(values) == 1:
+        return column == values[0]
+    return column.in_(bindparam(None, values, expanding=True, literal_execute=True))
+
+def ticket_filters(view: Optional[str], status: Optional[TicketStatus], current_user: User) -> list:
+    """WHERE conditions for the `view` and `status` list parameters"""
+    conditions = []
+
+    # Apply view filters
+    if view == "my_inbox":
+        conditions.append(Ticket.assignee_id == current_user.id)
+    elif view == "unsolved":
+        conditions.append(match_any(Ticket.status, UNSOLVED_STATUSES))
+    elif view == "pending":
+        conditions.append(Ticket.status == TicketStatus.PENDING)
+
+    # Apply status filter
+    if status:
+        conditions.append(Ticket.status == status)
+    return conditions
+
+# Whitelisted `sort` keys; each has an index ending in (column, id) for keyset paging
+SORT_COLUMNS = {"created_at": Ticket.created_at, "updated_at": Ticket.updated_at}
+SORT_PATTERN = "^-?(%s)$" % "|".join(SORT_COLUMNS)
+
+class TicketListFilters:
+    """
+    Structured filters shared by the ticket list and export, combined with AND.
+    status and priority may be repeated to match any of several values; the
+    date ranges are inclusive.
+    """
+    def __init__(
+        self,
+        view: Optional[str] = None,
+        status: Optional[List[TicketStatus]] = Query(None),
+        requester_id: Optional[int] = None,
+        assignee_id: Optional[int] = None,
+        priority: Optional[List[TicketPriority]] = Query(None),
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        review_from: Optional[datetime] = None,
+        review_to: Optional[datetime] = None
+    ):
+        self.view = view
+        # Deduplicated in declaration order, so equivalent requests share an ETag and
+        # the unsolved statuses render exactly like the partial index's predicate
+        self.status = [member for member in TicketStatus if member in (status or [])]
+        self.requester_id = requester_id
+        self.assignee_id = assignee_id
+        self.priority = [member for member in TicketPriority if member in (priority or [])]
+        self.created_from = created_from
+        self.created_to = created_to
+        self.review_from = review_from
+        self.review_to = review_to
+
+    def conditions(self, current_user: User) -> list:
+        # Equality predicates lead so they line up with the leading columns of the composite indexes
+        conditions = ticket_filters(self.view, None, current_user)
+        if self.requester_id is not None:
+            conditions.append(Ticket.requester_id == self.requester_id)
+        if self.assignee_id is not None:
+            conditions.append(Ticket.assignee_id == self.assignee_id)
+        if self.status:
+            conditions.append(match_any(Ticket.status, self.status))
+        if self.priority:
+            conditions.append(match_any(Ticket.priority, self.priority))
+        if self.created_from:
+            conditions.append(Ticket.created_at >= self.created_from)
+        if self.created_to:
+            conditions.append(Ticket.created_at <= self.created_to)
+        if self.review_from:
+            conditions.append(Ticket.review_date >= self.review_from)
+        if self.review_to:
+            conditions.append(Ticket.review_date <= self.review_to)
+        return conditions
+
+    def etag_parts(self, current_user: User) -> tuple:
+        return (
+            self.view, self.status, self.requester_id, self.assignee_id, self.priority,
+            self.created_from, self.created_to, self.review_from, self.review_to,
+            current_user.id if self.view == "my_inbox" else None
+        )
+
+def tickets_watermark(db: Session) -> tuple:
+    """
+    (latest updated_at, highest id, ticket count), which changes whenever any
+    ticket is created, updated or deleted. Each part is an index lookup or a
+    sum over the small counters table, never a scan of tickets.
+    """
+    return tuple(db.execute(select(
+        select(func.max(Ticket.updated_at)).scalar_subquery(),
+        select(func.max(Ticket.id)).scalar_subquery(),
+        select(func.coalesce(func.sum(TicketCounter.count), 0)).scalar_subquery()
+    )).one())
+
+def ticket_etag(ticket_id: int, updated_at: datetime) -> str:
+    return weak_etag("ticket", ticket_id, updated_at.isoformat() if updated_at else None)
+
 def generate_ticket_number(db: Session) -> str:
     """Generate a unique ticket number"""
-    last_ticket = db.query(Ticket).order_by(Ticket.id.desc()).first()
-    if last_ticket:
-        last_number = int(last_ticket.ticket_number.replace("#", ""))
-        new_number = last_number + 1
-    else:
-        new_number = 933000
-    return f"#{new_number}"
+    return f"#{ticket_numbers.allocate(db)}"
+
+def _encode_token(values: list) -> str:
+    raw = json.dumps(values)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_token(token: str) -> list:
+    padded = token + "=" * (-len(token) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded))
+
+def encode_cursor(ticket: Ticket, sort_key: str = "created_at") -> str:
+    """Encode the (sort column, id) position of a ticket as an opaque cursor"""
+    return _encode_token([getattr(ticket, sort_key).isoformat(), ticket.id])
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        sort_value, ticket_id = _decode_token(cursor)
+        return datetime.fromisoformat(sort_value), int(ticket_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def decode_search_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        score, ticket_id = _decode_token(cursor)
+        return float(score), int(ticket_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _parse_time(value: str | None) -> datetime | None:
+    return datetime.fromisoformat(value) if value else None
+
+def encode_changes_token(ticket_position, tombstone_position, horizon: datetime | None) -> str:
+    """
+    Positions are the (updated_at, id) / (deleted_at, id) of the last rows
+    reported, or None. horizon is the sync's cut-off time, None while the
+    first full sync is still paging.
+    """
+    values = []
+    for position in (ticket_position, tombstone_position):
+        values += [position[0].isoformat(), position[1]] if position else [None, None]
+    return _encode_token(values + [horizon.isoformat() if horizon else None])
+
+def decode_changes_token(token: str) -> tuple:
+    try:
+        updated_at, ticket_id, deleted_at, tombstone_id, horizon = _decode_token(token)
+        return (
+            (_parse_time(updated_at), int(ticket_id)) if updated_at else None,
+            (_parse_time(deleted_at), int(tombstone_id)) if deleted_at else None,
+            _parse_time(horizon)
+        )
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid token")
 
 @router.post("/", response_model=TicketResponse)
-def create_ticket(
+async def create_ticket(
     ticket_data: TicketCreate,
-    db: Session = Depends(get_db),
+    database: Database = Depends(get_database),
     current_user: User = Depends(get_current_user)
 ):
-    ticket_number = generate_ticket_number(db)
-    new_ticket = Ticket(
-        ticket_number=ticket_number,
-        subject=ticket_data.subject,
-        description=ticket_data.description,
-        priority=ticket_data.priority,
-        requester_id=current_user.id
-    )
-    db.add(new_ticket)
-    db.commit()
-    db.refresh(new_ticket)
+    def create(db: Session):
+        for attempt in range(2):
+            new_ticket = Ticket(
+                ticket_number=generate_ticket_number(db),
+                subject=ticket_data.subject,
+                description=ticket_data.description,
+                priority=ticket_data.priority,
+                requester_id=current_user.id
+            )
+            db.add(new_ticket)
+            try:
+                db.flush()
+                break
+            except IntegrityError:
+                db.rollback()
+                if attempt:
+                    raise
+                # An import took the number after this worker reserved its block;
+                # the sequence is already past it, so a fresh block is safe
+                ticket_numbers.discard_block()
+        index_ticket(db, new_ticket)
+        adjust_ticket_counter(db, new_ticket.status, new_ticket.assignee_id, 1)
+        adjust_user_ticket_counters(db, user_bucket(new_ticket), 1)
+        db.commit()
 
-    return {
-        **new_ticket.__dict__,
-        "requester": {
-            "id": new_ticket.requester.id,
-            "username": new_ticket.requester.username,
-            "email": new_ticket.requester.email,
-            "full_name": new_ticket.requester.full_name
-        },
-        "assignee": None
-    }
+        return serialize_ticket(get_ticket_or_404(db, new_ticket.id))
+
+    ticket = await database.run(create)
+    broadcaster.publish("ticket.created", ticket, [(ticket["status"], ticket["assignee_id"])])
+    return ticket
+
+@router.post("/import")
+async def import_ticket_file(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    batch_size: int = Query(IMPORT_BATCH_SIZE, ge=1, le=10000),
+    create_users: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """Bulk import tickets from a CSV or NDJSON upload (admins only)"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    fmt = format or detect_format(file.filename)
+    if fmt is None:
+        raise HTTPException(status_code=400, detail="Specify format=csv or format=ndjson")
+
+    def run_import():
+        # A long batch job: give it its own session on a worker thread in either DB_MODE
+        db = SessionLocal()
+        try:
+            # Imported users get one shared random password instead of a bcrypt hash each
+            password_hash = get_password_hash(secrets.token_urlsafe(32)) if create_users else None
+            return import_tickets(db, file.file, fmt, batch_size, create_users, password_hash)
+        finally:
+            db.close()
+
+    report = await run_in_threadpool(run_import)
+    if report["imported"]:
+        # Too many to describe one by one; every view should refetch
+        broadcaster.publish("tickets.imported", {"imported": report["imported"]})
+    return report
 
 @router.get("/", response_model=List[TicketResponse])
-def get_tickets(
+async def get_tickets(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    status: Optional[TicketStatus] = None,
-    view: Optional[str] = None,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    sort: str = Query("-created_at", pattern=SORT_PATTERN),
+    fields: Optional[str] = None,
+    filters: TicketListFilters = Depends(),
+    if_none_match: Optional[str] = Header(None),
+    database: Database = Depends(get_database),
     current_user: User = Depends(get_current_user)
 ):
-    query = db.query(Ticket)
+    """
+    List tickets matching the filters, newest first unless `sort` says otherwise
+    (created_at or updated_at, prefixed with - for descending). Pass the
+    X-Next-Cursor header back as `cursor`, with the same filters and sort, for the next page.
+    `fields` (comma-separated TicketResponse keys) returns only those keys, and
+    reads only their columns and joins
+    """
+    field_list = parse_fields(fields, TICKET_FIELDS)
+    sort_key = sort.lstrip("-")
+    descending = sort.startswith("-")
+    sort_column = SORT_COLUMNS[sort_key]
 
-    # Apply view filters
-    if view == "my_inbox":
-        query = query.filter(Ticket.assignee_id == current_user.id)
-    elif view == "unsolved":
-        query = query.filter(Ticket.status.in_([TicketStatus.OPEN, TicketStatus.IN_PROGRESS, TicketStatus.PENDING]))
-    elif view == "pending":
-        query = query.filter(Ticket.status == TicketStatus.PENDING)
+    def load(db: Session):
+        # Read before the page so the ETag can only ever be older than the data it labels
+        etag = weak_etag(
+            "tickets", *tickets_watermark(db), skip, limit, cursor, sort, field_list,
+            *filters.etag_parts(current_user)
+        )
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        response.headers["ETag"] = etag
 
-    # Apply status filter
-    if status:
-        query = query.filter(Ticket.status == status)
-
-    tickets = query.order_by(Ticket.created_at.desc()).offset(skip).limit(limit).all()
-
-    return [
-        {
-            **ticket.__dict__,
-            "requester": {
-                "id": ticket.requester.id,
-                "username": ticket.requester.username,
-                "email": ticket.requester.email,
-                "full_name": ticket.requester.full_name
-            },
-            "assignee": {
-                "id": ticket.assignee.id,
-                "username": ticket.assignee.username,
-                "email": ticket.assignee.email,
-                "full_name": ticket.assignee.full_name
-            } if ticket.assignee else None
+        if field_list is None:
+            query, project = ticket_query(db), serialize_ticket
+        else:
+            query, project = sparse_ticket_query(db, field_list, sort_key)
+        query = query.filter(*filters.conditions(current_user))
+
+        # Keyset pagination: seek past the last row of the previous page. A
+        # row-value comparison, unlike the equivalent OR, stays a single index range
+        if cursor:
+            position = tuple_(*decode_cursor(cursor))
+            row = tuple_(sort_column, Ticket.id)
+            query = query.filter(row < position if descending else row > position)
+
+        if descending:
+            query = query.order_by(sort_column.desc(), Ticket.id.desc())
+        else:
+            query = query.order_by(sort_column, Ticket.id)
+        if skip and not cursor:
+            query = query.offset(skip)
+
+        tickets = query.limit(limit).all()
+        if tickets and len(tickets) == limit:
+            response.headers["X-Next-Cursor"] = encode_cursor(tickets[-1], sort_key)
+
+        # Built from the rows, so already in (a subset of) the TicketResponse shape
+        return prevalidated([project(ticket) for ticket in tickets], response)
+
+    return await database.run(load)
+
+@router.get("/search", response_model=List[TicketResponse])
+async def search(
+    response: Response,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(25, ge=1, le=100),
+    cursor: Optional[str] = None,
+    database: Database = Depends(get_database),
+    current_user: User = Depends(get_current_user)
+):
+    """Full-text search over ticket number, subject, description and requester, best match first"""
+    after = decode_search_cursor(cursor) if cursor else None
+
+    def load(db: Session):
+        hits = search_tickets(db, q, limit, after)
+        if not hits:
+            return []
+
+        tickets = {t.id: t for t in ticket_query(db).filter(Ticket.id.in_([ticket_id for ticket_id, _ in hits]))}
+        if len(hits) == limit:
+            response.headers["X-Next-Cursor"] = _encode_token([hits[-1][1], hits[-1][0]])
+
+        return prevalidated(
+            [serialize_ticket(tickets[ticket_id]) for ticket_id, _ in hits if ticket_id in tickets], response
+        )
+
+    return await database.run(load)
+
+EXPORT_COLUMNS = [
+    "id", "ticket_number", "subject", "description", "status", "priority",
+    "requester_id", "requester_username", "requester_email", "requester_name",
+    "assignee_id", "assignee_username", "assignee_email", "assignee_name",
+    "created_at", "updated_at", "review_date"
+]
+# Rows fetched per round trip and written per chunk of the response
+EXPORT_BATCH_SIZE = 1000
+
+def export_rows(conditions: list):
+    """Yield export rows as dicts straight from a server-side cursor, people joined in SQL"""
+    requester = aliased(User)
+    assignee = aliased(User)
+    stmt = (
+        select(
+            Ticket.id, Ticket.ticket_number, Ticket.subject, Ticket.description, Ticket.status, Ticket.priority,
+            Ticket.requester_id,
+            requester.username.label("requester_username"),
+            requester.email.label("requester_email"),
+            requester.full_name.label("requester_name"),
+            Ticket.assignee_id,
+            assignee.username.label("assignee_username"),
+            assignee.email.label("assignee_email"),
+            assignee.full_name.label("assignee_name"),
+            Ticket.created_at, Ticket.updated_at, Ticket.review_date
+        )
+        .outerjoin(requester, Ticket.requester_id == requester.id)
+        .outerjoin(assignee, Ticket.assignee_id == assignee.id)
+        .where(*conditions)
+        .order_by(Ticket.created_at.desc(), Ticket.id.desc())
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+
+    # Exports outlive the request's session, so the generator owns its own
+    db = SessionLocal()
+    try:
+        for row in db.execute(stmt):
+            data = row._asdict()
+            data["status"] = data["status"].value if data["status"] else None
+            data["priority"] = data["priority"].value if data["priority"] else None
+            for key in ("created_at", "updated_at", "review_date"):
+                data[key] = data[key].isoformat() if data[key] else None
+            yield data
+    finally:
+        db.close()
+
+def export_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def export_ndjson(rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row))
+        if len(lines) == EXPORT_BATCH_SIZE:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+@router.get("/changes", response_model=TicketChangesResponse)
+async def get_ticket_changes(
+    since: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=1000),
+    database: Database = Depends(get_database),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Tickets created, updated or deleted since `since` (a previous next_token),
+    oldest change first. Without `since` every ticket is reported as created.
+    Keep calling with next_token while has_more is true; a 410 means the token
+    is older than the tombstone retention and the client must start over.
+    """
+    ticket_position = tombstone_position = previous_horizon = None
+    if since:
+        ticket_position, tombstone_position, previous_horizon = decode_changes_token(since)
+        if previous_horizon and previous_horizon < datetime.utcnow() - timedelta(days=TOMBSTONE_RETENTION_DAYS):
+            raise HTTPException(status_code=410, detail="Token expired, resync without since")
+
+    def load(db: Session):
+        horizon = datetime.utcnow() - timedelta(seconds=CHANGES_SETTLE_SECONDS)
+
+        # Both walks seek along their (timestamp, id) index and fetch one extra row to detect more
+        query = ticket_query(db).filter(Ticket.updated_at <= horizon)
+        if ticket_position:
+            query = query.filter(tuple_(Ticket.updated_at, Ticket.id) > tuple_(*ticket_position))
+        tickets = query.order_by(Ticket.updated_at, Ticket.id).limit(limit + 1).all()
+
+        tombstones = select(TicketTombstone).where(TicketTombstone.deleted_at <= horizon)
+        if tombstone_position:
+            tombstones = tombstones.where(
+                tuple_(TicketTombstone.deleted_at, TicketTombstone.id) > tuple_(*tombstone_position)
+            )
+        deleted = db.execute(
+            tombstones.order_by(TicketTombstone.deleted_at, TicketTombstone.id).limit(limit + 1)
+        ).scalars().all()
+
+        has_more = len(tickets) > limit or len(deleted) > limit
+        tickets, deleted = tickets[:limit], deleted[:limit]
+        next_ticket = (tickets[-1].updated_at, tickets[-1].id) if tickets else ticket_position
+        next_tombstone = (deleted[-1].deleted_at, deleted[-1].id) if deleted else tombstone_position
+
+        created, updated = [], []
+        for ticket in tickets:
+            is_new = previous_horizon is None or ticket.created_at > previous_horizon
+            (created if is_new else updated).append(serialize_ticket(ticket))
+        return {
+            "created": created,
+            "updated": updated,
+            "deleted": [tombstone.ticket_id for tombstone in deleted],
+            # Pages of one sync keep the horizon it started from, so "created" stays relative to the last sync
+            "next_token": encode_changes_token(next_ticket, next_tombstone, previous_horizon if has_more else horizon),
+            "has_more": has_more
         }
-        for ticket in tickets
-    ]
+
+    return await database.run(load)
+
+@router.get("/export")
+async def export_tickets(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    filters: TicketListFilters = Depends(),
+    current_user: User = Depends(get_current_user)
+):
+    """Stream every ticket matching the list filters as CSV or NDJSON"""
+    rows = export_rows(filters.conditions(current_user))
+    if format == "csv":
+        body, media_type = export_csv(rows), "text/csv"
+    else:
+        body, media_type = export_ndjson(rows), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="tickets.{format}"'}
+    )
+
+@router.get("/stream")
+async def stream_ticket_events(
+    view: Optional[str] = Query(None, pattern="^(my_inbox|unsolved|pending)$"),
+    access_token: Optional[str] = None,
+    token: Optional[str] = Depends(optional_oauth2_scheme)
+):
+    """
+    Server-sent events for tickets created, updated or deleted in `view`:
+    ticket.created, ticket.updated, ticket.deleted, tickets.updated (bulk),
+    tickets.imported, and resync when this client fell too far behind.
+    EventSource can't set headers, so browsers may pass ?access_token= instead.
+    """
+    # Authenticate with a short-lived session so an idle stream holds no database connection
+    async with database_session() as database:
+        current_user = await user_for_token(token or access_token, database)
+    if broadcaster.full():
+        raise HTTPException(status_code=503, detail="Too many open streams, retry later")
+
+    return StreamingResponse(
+        broadcaster.stream(view, current_user.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/{ticket_id}", response_model=TicketResponse)
-def get_ticket(ticket_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
-    if not ticket:
-        raise HTTPException(status_code=404, detail="Ticket not found")
+async def get_ticket(
+    ticket_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    database: Database = Depends(get_database),
+    current_user: User = Depends(get_current_user)
+):
+    def load(db: Session):
+        if if_none_match:
+            # Revalidation only needs the version, not the joined ticket
+            updated_at = db.execute(select(Ticket.updated_at).where(Ticket.id == ticket_id)).first()
+            if updated_at is not None and etag_matches(if_none_match, ticket_etag(ticket_id, updated_at[0])):
+                return not_modified(ticket_etag(ticket_id, updated_at[0]))
 
-    return {
-        **ticket.__dict__,
-        "requester": {
-            "id": ticket.requester.id,
-            "username": ticket.requester.username,
-            "full_name": ticket.requester.full_name
-        },
-        "assignee": {
-            "id": ticket.assignee.id,
-            "username": ticket.assignee.username,
-            "full_name": ticket.assignee.full_name
-        } if ticket.assignee else None
-    }
+        ticket = get_ticket_or_404(db, ticket_id)
+        response.headers["ETag"] = ticket_etag(ticket.id, ticket.updated_at)
+        return serialize_ticket(ticket)
+
+    return await database.run(load)
+
+@router.patch("/bulk")
+async def bulk_update_tickets(
+    bulk: TicketBulkUpdate,
+    database: Database = Depends(get_database),
+    current_user: User = Depends(get_current_user)
+):
+    """Apply one TicketUpdate to every ticket matching `ids` and/or the `view`/`status` filters"""
+    conditions = ticket_filters(bulk.view, bulk.status, current_user)
+    if bulk.ids is not None:
+        conditions.append(Ticket.id.in_(bulk.ids))
+    if not conditions:
+        raise HTTPException(status_code=400, detail="Provide ids or a view/status filter")
+    values = bulk.update.model_dump(exclude_none=True)
+    if not values:
+        raise HTTPException(status_code=400, detail="Nothing to update")
+
+    def update(db: Session):
+        # Lock the matched rows, then note their counter buckets
+        now = stamp_tickets(db, *conditions)
+        matched = db.execute(
+            select(Ticket.id, Ticket.status, Ticket.assignee_id, Ticket.requester_id, Ticket.priority)
+            .where(*conditions)
+        ).all()
+        ids = [row.id for row in matched]
+        mark_tickets_changed(db, ids)
+
+        for start in range(0, len(ids), IN_LIST_CHUNK):
+            db.execute(
+                sql_update(Ticket)
+                .where(Ticket.id.in_(ids[start:start + IN_LIST_CHUNK]))
+                .values(**values, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+
+        if "status" in values or "assignee_id" in values:
+            moved = Counter((row.status, row.assignee_id) for row in matched)
+            for (old_status, old_assignee_id), count in moved.items():
+                new_bucket = (values.get("status", old_status), values.get("assignee_id", old_assignee_id))
+                if new_bucket != (old_status, old_assignee_id):
+                    adjust_ticket_counter(db, old_status, old_assignee_id, -count)
+                    adjust_ticket_counter(db, *new_bucket, count)
+        if "status" in values or "assignee_id" in values or "priority" in values:
+            for old_bucket, count in Counter(user_bucket(row) for row in matched).items():
+                requester_id, assignee_id, status, priority = old_bucket
+                new_bucket = (
+                    requester_id, values.get("assignee_id", assignee_id),
+                    values.get("status", status), values.get("priority", priority)
+                )
+                move_user_ticket_counters(db, old_bucket, new_bucket, count)
+        if "subject" in values or "description" in values:
+            reindex_tickets(db, ids)
+        db.commit()
+        return matched
+
+    matched = await database.run(update)
+    ids = [row.id for row in matched]
+    if ids:
+        buckets = {(row.status, row.assignee_id) for row in matched}
+        buckets |= {(values.get("status", status), values.get("assignee_id", assignee_id)) for status, assignee_id in buckets}
+        broadcaster.publish("tickets.updated", {"ids": ids, "update": values}, buckets)
+    result = {"updated": len(ids)}
+    if bulk.return_ids:
+        result["ids"] = ids
+    return result
 
 @router.patch("/{ticket_id}", response_model=TicketResponse)
-def update_ticket(
+async def update_ticket(
     ticket_id: int,
     ticket_data: TicketUpdate,
-    db: Session = Depends(get_db),
+    database: Database = Depends(get_database),
     current_user: User = Depends(get_current_user)
 ):
-    ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
-    if not ticket:
-        raise HTTPException(status_code=404, detail="Ticket not found")
+    def update(db: Session):
+        # Lock the row before reading the buckets its counters move out of
+        now = stamp_tickets(db, Ticket.id == ticket_id)
+        ticket = get_ticket_or_404(db, ticket_id)
+        old_bucket = (ticket.status, ticket.assignee_id)
+        old_user_bucket = user_bucket(ticket)
 
-    # Update fields
-    if ticket_data.subject is not None:
-        ticket.subject = ticket_data.subject
-    if ticket_data.description is not None:
-        ticket.description = ticket_data.description
-    if ticket_data.status is not None:
-        ticket.status = ticket_data.status
-    if ticket_data.priority is not None:
-        ticket.priority = ticket_data.priority
-    if ticket_data.assignee_id is not None:
-        ticket.assignee_id = ticket_data.assignee_id
-
-    ticket.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(ticket)
+        # Update fields
+        if ticket_data.subject is not None:
+            ticket.subject = ticket_data.subject
+        if ticket_data.description is not None:
+            ticket.description = ticket_data.description
+        if ticket_data.status is not None:
+            ticket.status = ticket_data.status
+        if ticket_data.priority is not None:
+            ticket.priority = ticket_data.priority
+        if ticket_data.assignee_id is not None:
+            ticket.assignee_id = ticket_data.assignee_id
 
-    return {
-        **ticket.__dict__,
-        "requester": {
-            "id": ticket.requester.id,
-            "username": ticket.requester.username,
-            "full_name": ticket.requester.full_name
-        },
-        "assignee": {
-            "id": ticket.assignee.id,
-            "username": ticket.assignee.username,
-            "full_name": ticket.assignee.full_name
-        } if ticket.assignee else None
-    }
+        ticket.updated_at = now
+        if ticket_data.subject is not None or ticket_data.description is not None:
+            index_ticket(db, ticket)
+        move_ticket_counter(db, old_bucket, (ticket.status, ticket.assignee_id))
+        move_user_ticket_counters(db, old_user_bucket, user_bucket(ticket))
+        db.commit()
+
+        return serialize_ticket(get_ticket_or_404(db, ticket_id)), old_bucket
+
+    ticket, old_bucket = await database.run(update)
+    broadcaster.publish("ticket.updated", ticket, [old_bucket, (ticket["status"], ticket["assignee_id"])])
+    return ticket
 
 @router.delete("/{ticket_id}")
-def delete_ticket(
+async def delete_ticket(
     ticket_id: int,
-    db: Session = Depends(get_db),
+    database: Database = Depends(get_database),
     current_user: User = Depends(get_current_user)
 ):
-    ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
-    if not ticket:
-        raise HTTPException(status_code=404, detail="Ticket not found")
+    def delete(db: Session):
+        # Lock the row first, so two deletes can't both decrement its counters
+        stamp_tickets(db, Ticket.id == ticket_id)
+        ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
+        if not ticket:
+            raise HTTPException(status_code=404, detail="Ticket not found")
+
+        # Only allow admin or ticket creator to delete
+        if not current_user.is_admin and ticket.requester_id != current_user.id:
+            raise HTTPException(status_code=403, detail="Not authorized to delete this ticket")
 
-    # Only allow admin or ticket creator to delete
-    if not current_user.is_admin and ticket.requester_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized to delete this ticket")
+        db.delete(ticket)
+        db.add(TicketTombstone(ticket_id=ticket_id))
+        remove_ticket(db, ticket_id)
+        adjust_ticket_counter(db, ticket.status, ticket.assignee_id, -1)
+        adjust_user_ticket_counters(db, user_bucket(ticket), -1)
+        db.commit()
+        return ticket.status, ticket.assignee_id
 
-    db.delete(ticket)
-    db.commit()
+    bucket = await database.run(delete)
+    broadcaster.publish("ticket.deleted", {"id": ticket_id}, [bucket])
     return {"message": "Ticket deleted successfully"}
 
 @router.get("/stats/counts")
-def get_ticket_counts(
-    db: Session = Depends(get_db),
+async def get_ticket_counts(
+    database: Database = Depends(get_database),
     current_user: User = Depends(get_current_user)
 ):
     """Get ticket counts for different views"""
-    total = db.query(Ticket).count()
-    my_inbox = db.query(Ticket).filter(Ticket.assignee_id == current_user.id).count()
-    open_tickets = db.query(Ticket).filter(Ticket.status == TicketStatus.OPEN).count()
-    unsolved = db.query(Ticket).filter(
-        Ticket.status.in_([TicketStatus.OPEN, TicketStatus.IN_PROGRESS, TicketStatus.PENDING])
-    ).count()
-
-    return {
-        "total": total,
-        "my_inbox": my_inbox,
-        "open": open_tickets,
-        "unsolved": unsolved
-    }
+    return await database.run(read_ticket_counts, current_user.id)
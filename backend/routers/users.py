@@ -1,15 +1,61 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from pydantic import BaseModel
-from typing import List
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional
 from datetime import datetime
+import json
+import os
 
-from database import get_db
-from models import User
+from cache import TTLCache
+from counters import read_user_ticket_summary
+from database import Database, get_database
+from etags import etag_matches, not_modified, weak_etag
+from models import Ticket, User
+from responses import parse_fields, prevalidated
 from routers.auth import get_current_user
+from routers.tickets import TicketResponse, serialize_ticket, ticket_query
 
 router = APIRouter()
 
+# Invalidation below is the real mechanism; the TTL only bounds staleness from
+# writes it can't see, like another worker process or a direct database edit
+PUBLIC_USERS_CACHE_TTL_SECONDS = int(os.getenv("PUBLIC_USERS_CACHE_TTL_SECONDS", "30"))
+
+# One entry, (etag, encoded JSON object per user) for every active user by id.
+# Pages are sliced from it, so no choice of skip or limit reaches the database.
+public_users_cache = TTLCache(1, PUBLIC_USERS_CACHE_TTL_SECONDS)
+
+PUBLIC_FIELDS = ("id", "username", "full_name", "is_admin")
+# is_active decides who is listed at all
+DIRECTORY_FIELDS = PUBLIC_FIELDS + ("is_active",)
+
+@event.listens_for(Session, "after_flush")
+def _flag_directory_changes(session, flush_context):
+    for obj in session.new | session.deleted:
+        if isinstance(obj, User):
+            session.info["public_users_changed"] = True
+            break
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            state = inspect(obj)
+            if any(state.attrs[field].history.has_changes() for field in DIRECTORY_FIELDS):
+                session.info["public_users_changed"] = True
+                break
+
+@event.listens_for(Session, "do_orm_execute")
+def _flag_bulk_directory_changes(orm_execute_state):
+    # Core-style insert()/update() of users, e.g. users created by a bulk import
+    if not orm_execute_state.is_select and any(
+        mapper.class_ is User for mapper in orm_execute_state.all_mappers
+    ):
+        orm_execute_state.session.info["public_users_changed"] = True
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_public_users(session):
+    if session.info.pop("public_users_changed", False):
+        public_users_cache.clear()
+
 class UserResponse(BaseModel):
     id: int
     email: str
@@ -22,6 +68,8 @@ class UserResponse(BaseModel):
     class Config:
         from_attributes = True
 
+USER_FIELDS = list(UserResponse.model_fields)
+
 class PublicUserResponse(BaseModel):
     id: int
     username: str
@@ -31,26 +79,105 @@ class PublicUserResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class TicketCounts(BaseModel):
+    total: int
+    by_status: Dict[str, int]
+    by_priority: Dict[str, int]
+
+class UserTicketSummary(BaseModel):
+    user_id: int
+    requested: TicketCounts
+    assigned: TicketCounts
+    recent_requested: List[TicketResponse]
+    recent_assigned: List[TicketResponse]
+
 
 @router.get("/public", response_model=List[PublicUserResponse])
-def get_public_users(db: Session = Depends(get_db)):
-    """Public endpoint to list all users (no authentication required)"""
-    users = db.query(User).filter(User.is_active == 1).all()
-    return users
+async def get_public_users(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    if_none_match: Optional[str] = Header(None),
+    database: Database = Depends(get_database)
+):
+    """Public endpoint to list active users by id (no authentication required)"""
+    cached = public_users_cache.get("active")
+    if cached is None:
+        # Taken before the read: a user change committed meanwhile must not be overwritten by this list
+        generation = public_users_cache.generation
+
+        def load(db: Session):
+            rows = db.query(*(getattr(User, field) for field in PUBLIC_FIELDS)) \
+                .filter(User.is_active == 1).order_by(User.id).all()
+            return [json.dumps(dict(zip(PUBLIC_FIELDS, row))).encode() for row in rows]
+
+        entries = await database.run(load)
+        cached = (weak_etag("public-users", b",".join(entries)), entries)
+        public_users_cache.set("active", cached, generation=generation)
+
+    list_etag, entries = cached
+    etag = weak_etag(list_etag, skip, limit)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    body = b"[" + b", ".join(entries[skip:skip + limit]) + b"]"
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
 
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: User = Depends(get_current_user)):
     return current_user
 
 @router.get("/", response_model=List[UserResponse])
-def get_users(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    users = db.query(User).all()
-    return users
+async def get_users(
+    fields: Optional[str] = None,
+    database: Database = Depends(get_database),
+    current_user: User = Depends(get_current_user)
+):
+    """All users; `fields` (comma-separated UserResponse keys) selects only those columns"""
+    field_list = parse_fields(fields, USER_FIELDS) or USER_FIELDS
+
+    def load(db: Session):
+        # Only the response's columns, so hashed_password never leaves the database
+        rows = db.query(*(getattr(User, field) for field in field_list)).all()
+        return prevalidated([dict(zip(field_list, row)) for row in rows])
+
+    return await database.run(load)
 
 @router.get("/{user_id}", response_model=UserResponse)
-def get_user(user_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    user = db.query(User).filter(User.id == user_id).first()
+async def get_user(user_id: int, database: Database = Depends(get_database), current_user: User = Depends(get_current_user)):
+    user = await database.run(lambda db: db.query(User).filter(User.id == user_id).first())
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
+
+@router.get("/{user_id}/summary", response_model=UserTicketSummary)
+async def get_user_summary(
+    user_id: int,
+    recent: int = Query(5, ge=0, le=50),
+    database: Database = Depends(get_database),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Status and priority counts of the tickets a user requested and is assigned,
+    plus the newest few of each. Counts come from user_ticket_counters and the
+    recent tickets from index range reads, so the cost doesn't grow with the
+    user's ticket count.
+    """
+    def load(db: Session):
+        if db.query(User.id).filter(User.id == user_id).first() is None:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        def newest(column) -> list:
+            if not recent:
+                return []
+            tickets = ticket_query(db).filter(column == user_id) \
+                .order_by(Ticket.created_at.desc(), Ticket.id.desc()).limit(recent).all()
+            return [serialize_ticket(ticket) for ticket in tickets]
+
+        return {
+            "user_id": user_id,
+            **read_user_ticket_summary(db, user_id),
+            "recent_requested": newest(Ticket.requester_id),
+            "recent_assigned": newest(Ticket.assignee_id)
+        }
+
+    return await database.run(load)
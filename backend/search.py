@@ -0,0 +1,204 @@
+"""
+Full-text search index over ticket numbers, subjects, descriptions and the
+requester's username and email.
+
+SQLite uses an FTS5 table keyed by ticket id that the ticket write paths keep
+in sync, and that is refreshed when a requester's username or email changes.
+PostgreSQL uses GIN expression indexes on tickets and on users, which the
+database maintains itself, so the sync helpers are no-ops there. An index
+expression can't reach into another table, so on PostgreSQL a ticket matches
+when all terms match either its own text or its requester.
+"""
+import re
+
+from sqlalchemy import bindparam, event, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from database import IN_LIST_CHUNK
+from models import Ticket, User
+
+FTS_TABLE = "tickets_fts"
+FTS_COLUMNS = "ticket_number, subject, description, requester"
+# The FTS row of every ticket the WHERE clause selects
+FTS_SOURCE = (
+    "SELECT tickets.id, tickets.ticket_number, tickets.subject, coalesce(tickets.description, ''), "
+    "coalesce(users.username, '') || ' ' || coalesce(users.email, '') "
+    "FROM tickets LEFT JOIN users ON users.id = tickets.requester_id"
+)
+PG_INDEX = "ix_tickets_search"
+PG_DOCUMENT = (
+    "to_tsvector('english', coalesce(ticket_number, '') || ' ' || "
+    "coalesce(subject, '') || ' ' || coalesce(description, ''))"
+)
+PG_REQUESTER_INDEX = "ix_users_search"
+# 'simple': usernames and email addresses aren't English words to stem
+PG_REQUESTER_DOCUMENT = "to_tsvector('simple', coalesce(username, '') || ' ' || coalesce(email, ''))"
+# Changing either of these changes the requester text of the user's tickets
+REQUESTER_FIELDS = ("username", "email")
+
+def _is_sqlite(bind) -> bool:
+    return bind.dialect.name == "sqlite"
+
+def _is_postgres(bind) -> bool:
+    return bind.dialect.name == "postgresql"
+
+def setup_search_index(engine: Engine):
+    """Create the search index if missing, populating it from existing tickets"""
+    with engine.begin() as conn:
+        if _is_sqlite(conn):
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": FTS_TABLE}
+            ).first()
+            if exists and "requester" not in _fts_columns(conn):
+                # Built before the requester column was added
+                conn.execute(text(f"DROP TABLE {FTS_TABLE}"))
+                exists = None
+            if not exists:
+                conn.execute(text(f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5({FTS_COLUMNS})"))
+                _populate_sqlite(conn)
+        elif _is_postgres(conn):
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS {PG_INDEX} ON tickets USING GIN ({PG_DOCUMENT})"
+            ))
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS {PG_REQUESTER_INDEX} ON users USING GIN ({PG_REQUESTER_DOCUMENT})"
+            ))
+
+def _fts_columns(conn) -> set[str]:
+    return {row[1] for row in conn.execute(text(f"PRAGMA table_info({FTS_TABLE})"))}
+
+def _populate_sqlite(conn):
+    conn.execute(text(f"INSERT INTO {FTS_TABLE} (rowid, {FTS_COLUMNS}) {FTS_SOURCE}"))
+
+def rebuild_search_index(db: Session) -> int:
+    """Re-derive the whole index from the tickets table; returns tickets indexed"""
+    bind = db.get_bind()
+    if _is_sqlite(bind):
+        db.execute(text(f"DELETE FROM {FTS_TABLE}"))
+        _populate_sqlite(db.connection())
+    elif _is_postgres(bind):
+        db.execute(text(f"REINDEX INDEX {PG_INDEX}"))
+        db.execute(text(f"REINDEX INDEX {PG_REQUESTER_INDEX}"))
+    db.commit()
+    return db.query(Ticket).count()
+
+def index_ticket(db: Session, ticket: Ticket):
+    """Add or refresh a ticket in the index; call before committing the write"""
+    if not _is_sqlite(db.get_bind()):
+        return
+    remove_ticket(db, ticket.id)
+    db.execute(
+        text(
+            f"INSERT INTO {FTS_TABLE} (rowid, {FTS_COLUMNS}) "
+            "VALUES (:id, :ticket_number, :subject, :description, "
+            "(SELECT username || ' ' || email FROM users WHERE id = :requester_id))"
+        ),
+        {
+            "id": ticket.id,
+            "ticket_number": ticket.ticket_number,
+            "subject": ticket.subject,
+            "description": ticket.description or "",
+            "requester_id": ticket.requester_id
+        }
+    )
+
+def index_tickets(db: Session, ticket_ids: list[int]):
+    """Index freshly inserted tickets in one statement (bulk import path)"""
+    if not ticket_ids or not _is_sqlite(db.get_bind()):
+        return
+    db.execute(
+        text(
+            f"INSERT INTO {FTS_TABLE} (rowid, {FTS_COLUMNS}) {FTS_SOURCE} WHERE tickets.id IN :ids"
+        ).bindparams(bindparam("ids", expanding=True)),
+        {"ids": ticket_ids}
+    )
+
+def reindex_tickets(db: Session, ticket_ids: list[int]):
+    """Refresh many tickets after a set-based update of their text"""
+    if not ticket_ids or not _is_sqlite(db.get_bind()):
+        return
+    for start in range(0, len(ticket_ids), IN_LIST_CHUNK):
+        chunk = ticket_ids[start:start + IN_LIST_CHUNK]
+        db.execute(
+            text(f"DELETE FROM {FTS_TABLE} WHERE rowid IN :ids").bindparams(bindparam("ids", expanding=True)),
+            {"ids": chunk}
+        )
+        index_tickets(db, chunk)
+
+def remove_ticket(db: Session, ticket_id: int):
+    if not _is_sqlite(db.get_bind()):
+        return
+    db.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": ticket_id})
+
+def _reindex_requested_tickets(db: Session, user_id: int):
+    requested = "SELECT id FROM tickets WHERE requester_id = :user_id"
+    db.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({requested})"), {"user_id": user_id})
+    db.execute(
+        text(f"INSERT INTO {FTS_TABLE} (rowid, {FTS_COLUMNS}) {FTS_SOURCE} WHERE tickets.requester_id = :user_id"),
+        {"user_id": user_id}
+    )
+
+@event.listens_for(Session, "after_flush")
+def _reindex_renamed_requesters(session, flush_context):
+    if not _is_sqlite(session.get_bind()):
+        return
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            state = inspect(obj)
+            if any(state.attrs[field].history.has_changes() for field in REQUESTER_FIELDS):
+                _reindex_requested_tickets(session, obj.id)
+
+def _terms(q: str) -> list[str]:
+    # Keep only word characters so user input can never inject query syntax
+    return re.findall(r"\w+", q.lower())
+
+def search_tickets(
+    db: Session,
+    q: str,
+    limit: int,
+    after: tuple[float, int] | None = None
+) -> list[tuple[int, float]]:
+    """
+    Return (ticket_id, score) pairs best match first. Every term must match;
+    the last term is treated as a prefix so partially typed words still hit.
+    `after` is the (score, ticket_id) of the last row of the previous page.
+    """
+    terms = _terms(q)
+    if not terms:
+        return []
+
+    bind = db.get_bind()
+    if _is_postgres(bind):
+        match = " & ".join(terms[:-1] + [f"{terms[-1]}:*"])
+        # Each side is served by its own GIN index; a ticket matching both keeps its better score
+        ranked = (
+            "SELECT id, max(score) AS score FROM ("
+            f"SELECT id, ts_rank({PG_DOCUMENT}, to_tsquery('english', :match))::float8 AS score "
+            f"FROM tickets WHERE {PG_DOCUMENT} @@ to_tsquery('english', :match) "
+            "UNION ALL "
+            f"SELECT tickets.id, ts_rank({PG_REQUESTER_DOCUMENT}, to_tsquery('simple', :match))::float8 "
+            "FROM tickets JOIN users ON users.id = tickets.requester_id "
+            f"WHERE {PG_REQUESTER_DOCUMENT} @@ to_tsquery('simple', :match)"
+            ") AS matches GROUP BY id"
+        )
+    else:
+        match = " ".join(f'"{term}"' for term in terms[:-1]) + f' "{terms[-1]}"*'
+        # bm25() is lower-is-better, negate it so both backends sort score DESC
+        ranked = (
+            f"SELECT rowid AS id, -bm25({FTS_TABLE}) AS score "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"
+        )
+
+    params = {"match": match, "limit": limit}
+    seek = ""
+    if after:
+        seek = "WHERE score < :score OR (score = :score AND id > :id)"
+        params.update({"score": after[0], "id": after[1]})
+
+    rows = db.execute(
+        text(f"SELECT id, score FROM ({ranked}) AS ranked {seek} ORDER BY score DESC, id LIMIT :limit"),
+        params
+    ).all()
+    return [(row.id, row.score) for row in rows]
@@ -0,0 +1,230 @@
+"""
+Streaming bulk ticket import from CSV or NDJSON.
+
+Rows are read one at a time and written in batches: each batch resolves its
+requester/assignee emails with one query, inserts its tickets with one
+executemany and commits. Bad rows are reported and skipped without failing
+the rest of their batch.
+
+Recognised columns: subject (required), requester_email (required),
+assignee_email, ticket_number, description, status, priority, created_at,
+review_date. Dates are ISO 8601.
+"""
+from collections import Counter
+from datetime import datetime
+import codecs
+import csv
+import json
+import os
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from changes import mark_tickets_changed
+from counters import adjust_ticket_counter, adjust_user_ticket_counters
+from database import upsert_insert
+from models import Ticket, TicketPriority, TicketStatus, User
+from search import index_tickets
+from ticket_numbers import numeric_part, ticket_numbers
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+# Keeps the report bounded when a whole file is malformed
+MAX_REPORTED_ERRORS = 1000
+
+class RowError(ValueError):
+    pass
+
+def detect_format(filename: str | None) -> str | None:
+    extension = os.path.splitext(filename or "")[1].lower()
+    return {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}.get(extension)
+
+def iter_rows(stream, fmt: str):
+    """Yield (line_number, row) pairs from a binary stream without reading it all"""
+    text = codecs.getreader("utf-8-sig")(stream)
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == "ndjson":
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_number, RowError(f"invalid JSON: {e}")
+                continue
+            yield line_number, row if isinstance(row, dict) else RowError("expected a JSON object")
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+def _text(row: dict, key: str) -> str | None:
+    value = row.get(key)
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+def _enum(row: dict, key: str, enum, default):
+    value = _text(row, key)
+    if value is None:
+        return default
+    try:
+        return enum(value.lower())
+    except ValueError:
+        raise RowError(f"invalid {key} '{value}'")
+
+def _date(row: dict, key: str) -> datetime | None:
+    value = _text(row, key)
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise RowError(f"invalid {key} '{value}'")
+
+def parse_row(row: dict) -> dict:
+    """Validate a raw row; emails are kept for the per-batch lookup"""
+    subject = _text(row, "subject")
+    if not subject:
+        raise RowError("subject is required")
+    requester_email = _text(row, "requester_email")
+    if not requester_email:
+        raise RowError("requester_email is required")
+    ticket_number = _text(row, "ticket_number")
+    created_at = _date(row, "created_at") or datetime.utcnow()
+    return {
+        "ticket_number": f"#{ticket_number.lstrip('#')}" if ticket_number else None,
+        "subject": subject,
+        "description": _text(row, "description"),
+        "status": _enum(row, "status", TicketStatus, TicketStatus.OPEN),
+        "priority": _enum(row, "priority", TicketPriority, TicketPriority.MEDIUM),
+        "requester_email": requester_email.lower(),
+        "assignee_email": (_text(row, "assignee_email") or "").lower() or None,
+        "created_at": created_at,
+        # When it changed here, not in the source system, so the /changes feed picks it up;
+        # restamped as the batch commits
+        "updated_at": datetime.utcnow(),
+        "review_date": _date(row, "review_date")
+    }
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, line: int, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def as_dict(self) -> dict:
+        return {
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors)
+        }
+
+def _user_ids_by_email(db: Session, emails: set[str], create_missing: bool, password_hash: str | None) -> dict:
+    found = dict(db.execute(select(User.email, User.id).where(User.email.in_(emails))).all())
+    missing = emails - found.keys()
+    if missing and create_missing:
+        insert_user = upsert_insert(db.get_bind().dialect.name)
+        db.execute(
+            insert_user(User).on_conflict_do_nothing(),
+            [
+                {"email": email, "username": email, "full_name": email.split("@")[0], "hashed_password": password_hash}
+                for email in missing
+            ]
+        )
+        found.update(db.execute(select(User.email, User.id).where(User.email.in_(missing))).all())
+    return found
+
+def _import_batch(db: Session, batch: list[tuple[int, dict]], report: ImportReport, create_users: bool, password_hash):
+    # Reserve numbers before this batch writes anything: on SQLite the reservation's
+    # own transaction would otherwise wait on our write lock. Rows that fail just leave gaps.
+    unnumbered = [row for _, row in batch if not row["ticket_number"]]
+    if unnumbered:
+        start, _ = ticket_numbers.reserve(db, len(unnumbered))
+        for offset, row in enumerate(unnumbered):
+            row["ticket_number"] = f"#{start + offset}"
+
+    emails = {row["requester_email"] for _, row in batch} | {row["assignee_email"] for _, row in batch if row["assignee_email"]}
+    user_ids = _user_ids_by_email(db, emails, create_users, password_hash)
+
+    given_numbers = [row["ticket_number"] for _, row in batch if row["ticket_number"]]
+    taken = set(db.execute(select(Ticket.ticket_number).where(Ticket.ticket_number.in_(given_numbers))).scalars())
+
+    values = []
+    for line, row in batch:
+        requester_id = user_ids.get(row["requester_email"])
+        assignee_id = user_ids.get(row["assignee_email"]) if row["assignee_email"] else None
+        if requester_id is None:
+            report.error(line, f"unknown requester_email '{row['requester_email']}'")
+        elif row["assignee_email"] and assignee_id is None:
+            report.error(line, f"unknown assignee_email '{row['assignee_email']}'")
+        elif row["ticket_number"] in taken:
+            report.error(line, f"duplicate ticket_number '{row['ticket_number']}'")
+        else:
+            if row["ticket_number"]:
+                taken.add(row["ticket_number"])
+            values.append({
+                **{key: value for key, value in row.items() if not key.endswith("_email")},
+                "requester_id": requester_id,
+                "assignee_id": assignee_id
+            })
+
+    if not values:
+        db.commit()
+        return
+
+    db.execute(insert(Ticket), values)
+    # Keep the allocator from handing out the numbers this batch brought with it
+    imported_numbers = [numeric_part(value["ticket_number"]) for value in values]
+    highest = max((number for number in imported_numbers if number is not None), default=None)
+    if highest is not None:
+        ticket_numbers.advance_past(db, highest)
+    ids = db.execute(
+        select(Ticket.id).where(Ticket.ticket_number.in_([value["ticket_number"] for value in values]))
+    ).scalars().all()
+    index_tickets(db, ids)
+    mark_tickets_changed(db, ids)
+    for (status, assignee_id), count in Counter((v["status"], v["assignee_id"]) for v in values).items():
+        adjust_ticket_counter(db, status, assignee_id, count)
+    for bucket, count in Counter(
+        (v["requester_id"], v["assignee_id"], v["status"], v["priority"]) for v in values
+    ).items():
+        adjust_user_ticket_counters(db, bucket, count)
+    db.commit()
+    report.imported += len(values)
+
+def import_tickets(
+    db: Session,
+    stream,
+    fmt: str,
+    batch_size: int = IMPORT_BATCH_SIZE,
+    create_users: bool = False,
+    password_hash: str | None = None
+) -> dict:
+    """
+    Import tickets from a binary stream. With create_users, unknown emails
+    become users whose username is their email and whose password is
+    password_hash (hash it once per import, not per user).
+    """
+    report = ImportReport()
+    batch = []
+    for line, row in iter_rows(stream, fmt):
+        try:
+            if isinstance(row, RowError):
+                raise row
+            batch.append((line, parse_row(row)))
+        except RowError as e:
+            report.error(line, str(e))
+        if len(batch) >= batch_size:
+            _import_batch(db, batch, report, create_users, password_hash)
+            batch = []
+    if batch:
+        _import_batch(db, batch, report, create_users, password_hash)
+    return report.as_dict()
@@ -0,0 +1,96 @@
+"""
+Ticket number allocation.
+
+Each worker reserves a block of numbers from the number_sequences row in its
+own short transaction and then hands them out from memory, so most creates
+need no extra round trip and concurrent workers never see the same number.
+Numbers left in a block when a worker exits are simply skipped. Imports that
+bring their own numbers move the sequence past them (advance_past), and a
+worker whose block turns out to hold an imported number drops it
+(discard_block) and reserves a fresh one.
+"""
+from threading import Lock
+import os
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from database import upsert_insert
+from models import NumberSequence, Ticket
+
+TICKET_NUMBER_BLOCK_SIZE = int(os.getenv("TICKET_NUMBER_BLOCK_SIZE", "50"))
+FIRST_TICKET_NUMBER = 933000
+
+class TicketNumberAllocator:
+    def __init__(self, name: str = "ticket_number", block_size: int = TICKET_NUMBER_BLOCK_SIZE):
+        self.name = name
+        self.block_size = block_size
+        self._next = 0
+        self._end = 0
+        # Only guards the in-memory block, never held across database I/O
+        self._lock = Lock()
+
+    def allocate(self, db: Session) -> int:
+        with self._lock:
+            if self._next < self._end:
+                number = self._next
+                self._next += 1
+                return number
+
+        start, end = self.reserve(db, self.block_size)
+        with self._lock:
+            # If another request refilled meanwhile, the rest of this block is skipped
+            if self._next >= self._end:
+                self._next, self._end = start + 1, end
+        return start
+
+    def advance_past(self, db: Session, number: int):
+        """Make sure `number` is never handed out, in db's transaction"""
+        db.execute(
+            update(NumberSequence)
+            .where(NumberSequence.name == self.name, NumberSequence.next_value <= number)
+            .values(next_value=number + 1)
+        )
+        with self._lock:
+            if self._next <= number < self._end:
+                self._next = number + 1
+
+    def discard_block(self):
+        """Forget this worker's block, so the next allocation reserves a fresh one"""
+        with self._lock:
+            self._end = self._next
+
+    def reserve(self, db: Session, count: int) -> tuple[int, int]:
+        """Claim [start, end) for this process; commits independently of db's transaction"""
+        with db.get_bind().begin() as conn:
+            claim = (
+                update(NumberSequence)
+                .where(NumberSequence.name == self.name)
+                .values(next_value=NumberSequence.next_value + count)
+                .returning(NumberSequence.next_value)
+            )
+            end = conn.execute(claim).scalar()
+            if end is None:
+                insert = upsert_insert(conn.dialect.name)
+                conn.execute(
+                    insert(NumberSequence)
+                    .values(name=self.name, next_value=self._first_free_number(conn))
+                    .on_conflict_do_nothing(index_elements=[NumberSequence.name])
+                )
+                end = conn.execute(claim).scalar()
+        return end - count, end
+
+    def _first_free_number(self, conn) -> int:
+        # One-off scan when the sequence row is first created on an existing database
+        numbers = [
+            value for value in map(numeric_part, conn.execute(select(Ticket.ticket_number)).scalars())
+            if value is not None
+        ]
+        return max(numbers) + 1 if numbers else FIRST_TICKET_NUMBER
+
+def numeric_part(ticket_number: str) -> int | None:
+    """The number in "#933001" or "933001", None for other formats"""
+    digits = ticket_number.lstrip("#")
+    return int(digits) if digits.isdigit() else None
+
+ticket_numbers = TicketNumberAllocator()
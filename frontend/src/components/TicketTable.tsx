@@ -4,6 +4,9 @@ import { TicketStatus } from '../types/index.js';
 import { formatDate } from '../lib/utils.js';
 import { Download, Play } from 'lucide-react';
 
+// The ticket keys the table renders, for the list endpoint's ?fields=
+export const TICKET_TABLE_FIELDS = 'id,ticket_number,subject,description,status,review_date,requester';
+
 interface TicketTableProps {
   tickets: Ticket[];
   onRefresh: () => void;
@@ -3,7 +3,7 @@ import { useNavigate, useSearchParams } from 'react-router-dom';
 import type { Ticket, User } from '../types/index.js';
 import api from '../lib/api.js';
 import Sidebar from '../components/Sidebar.js';
-import TicketTable from '../components/TicketTable.js';
+import TicketTable, { TICKET_TABLE_FIELDS } from '../components/TicketTable.js';
 import SearchDropdown from '../components/SearchDropdown.js';
 import { LogOut, Search, Grid } from 'lucide-react';
 
@@ -41,7 +41,7 @@ export default function Dashboard() {
     try {
       setLoading(true);
       const response = await api.get<Ticket[]>('/tickets/', {
-        params: { view: currentView }
+        params: { view: currentView, fields: TICKET_TABLE_FIELDS }
       });
       setTickets(response.data);
     } catch (error) {
@@ -38,19 +38,12 @@ export default function Search() {
   const searchTickets = async () => {
     try {
       setLoading(true);
-      const response = await api.get<Ticket[]>('/tickets/');
+      // Ranked full-text search runs on the server across all tickets
+      const response = await api.get<Ticket[]>('/tickets/search', {
+        params: { q: query },
+      });
 
-      // Filter tickets by search query
-      const filtered = response.data.filter(
-        (ticket) =>
-          ticket.subject.toLowerCase().includes(query.toLowerCase()) ||
-          ticket.ticket_number.includes(query) ||
-          ticket.description?.toLowerCase().includes(query.toLowerCase()) ||
-          ticket.requester.username.toLowerCase().includes(query.toLowerCase()) ||
-          ticket.requester.email?.toLowerCase().includes(query.toLowerCase())
-      );
-
-      setTickets(filtered);
+      setTickets(response.data);
     } catch (error) {
       console.error('Failed to search tickets:', error);
     } finally {
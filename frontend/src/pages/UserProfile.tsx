@@ -1,15 +1,21 @@
 import { useState, useEffect } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import { X } from 'lucide-react';
-import type { User, Ticket } from '../types/index.js';
+import type { User, Ticket, UserTicketSummary } from '../types/index.js';
 import api from '../lib/api.js';
 import { formatDate } from '../lib/utils.js';
 
+const TICKETS_PAGE_SIZE = 100;
+const TICKET_LIST_FIELDS = 'id,ticket_number,subject,status,created_at,updated_at';
+
 export default function UserProfile() {
   const { id } = useParams();
   const navigate = useNavigate();
   const [user, setUser] = useState<User | null>(null);
+  const [summary, setSummary] = useState<UserTicketSummary | null>(null);
   const [tickets, setTickets] = useState<Ticket[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [activeTab, setActiveTab] = useState('tickets');
 
@@ -21,16 +27,16 @@ export default function UserProfile() {
     try {
       setLoading(true);
 
-      // Fetch user details
-      const userResponse = await api.get<User>(`/users/${id}`);
+      // Fetch user details, their ticket counts and the first page of tickets they requested
+      const [userResponse, summaryResponse, page] = await Promise.all([
+        api.get<User>(`/users/${id}`),
+        api.get<UserTicketSummary>(`/users/${id}/summary`, { params: { recent: 0 } }),
+        fetchTicketPage(),
+      ]);
       setUser(userResponse.data);
-
-      // Fetch all tickets and filter by this user
-      const ticketsResponse = await api.get<Ticket[]>('/tickets/');
-      const userTickets = ticketsResponse.data.filter(
-        ticket => ticket.requester_id === parseInt(id!)
-      );
-      setTickets(userTickets);
+      setSummary(summaryResponse.data);
+      setTickets(page.tickets);
+      setNextCursor(page.cursor);
     } catch (error) {
       console.error('Failed to fetch user data:', error);
     } finally {
@@ -38,6 +44,27 @@ export default function UserProfile() {
     }
   };
 
+  const fetchTicketPage = async (cursor?: string) => {
+    const response = await api.get<Ticket[]>('/tickets/', {
+      params: { requester_id: id, limit: TICKETS_PAGE_SIZE, cursor, fields: TICKET_LIST_FIELDS },
+    });
+    return { tickets: response.data, cursor: (response.headers['x-next-cursor'] as string | undefined) ?? null };
+  };
+
+  const loadMoreTickets = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const page = await fetchTicketPage(nextCursor);
+      setTickets(current => [...current, ...page.tickets]);
+      setNextCursor(page.cursor);
+    } catch (error) {
+      console.error('Failed to fetch more tickets:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const getStatusColor = (status: string) => {
     const colors: Record<string, string> = {
       open: 'bg-red-600',
@@ -182,7 +209,7 @@ export default function UserProfile() {
                               : 'border-transparent text-gray-600'
                           }`}
                         >
-                          Tickets ({tickets.length})
+                          Tickets ({summary?.requested.total ?? tickets.length})
                         </button>
                         <button
                           onClick={() => setActiveTab('related')}
@@ -216,13 +243,16 @@ export default function UserProfile() {
                     <div className="p-6">
                       <div className="mb-4">
                         <h3 className="text-sm font-semibold mb-2">
-                          Requested tickets ({tickets.length})
+                          Requested tickets ({summary?.requested.total ?? tickets.length})
                         </h3>
-                        <div className="text-xs text-gray-600 mb-4">
-                          {tickets.filter(t => t.status === 'resolved' || t.status === 'closed').length > 0 && (
-                            <div>Status category: solved</div>
-                          )}
-                        </div>
+                        {summary && (
+                          <div className="text-xs text-gray-600 mb-4 space-x-3">
+                            <span>Open: {summary.requested.by_status.open + summary.requested.by_status.in_progress}</span>
+                            <span>Pending: {summary.requested.by_status.pending}</span>
+                            <span>Solved: {summary.requested.by_status.resolved + summary.requested.by_status.closed}</span>
+                            <span>Assigned to this user: {summary.assigned.total}</span>
+                          </div>
+                        )}
                       </div>
 
                       {tickets.length === 0 ? (
@@ -297,6 +327,18 @@ export default function UserProfile() {
                           </tbody>
                         </table>
                       )}
+
+                      {nextCursor && (
+                        <div className="pt-4 text-center">
+                          <button
+                            onClick={loadMoreTickets}
+                            disabled={loadingMore}
+                            className="text-sm text-blue-600 hover:underline disabled:text-gray-400"
+                          >
+                            {loadingMore ? 'Loading...' : 'Load more tickets'}
+                          </button>
+                        </div>
+                      )}
                     </div>
                   )}
 
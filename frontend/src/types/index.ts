@@ -53,6 +53,20 @@ export interface Ticket {
   } | null;
 }
 
+export interface TicketCounts {
+  total: number;
+  by_status: Record<TicketStatus, number>;
+  by_priority: Record<TicketPriority, number>;
+}
+
+export interface UserTicketSummary {
+  user_id: number;
+  requested: TicketCounts;
+  assigned: TicketCounts;
+  recent_requested: Ticket[];
+  recent_assigned: Ticket[];
+}
+
 export interface TicketCreate {
   subject: string;
   description?: string;